@@ -11,4 +11,8 @@ def init_api(config_manager_instance, socketio_instance, reload_callback):
 
     keybindings.config_manager = config_manager_instance
     images.config_manager = config_manager_instance
+    images.socketio = socketio_instance
     server_control.config_manager = config_manager_instance
+
+def set_keyboard_handler(handler):
+    server_control.keyboard_handler = handler
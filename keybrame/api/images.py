@@ -1,100 +1,212 @@
 from flask import jsonify, request
+from werkzeug.formparser import parse_form_data
 import os
+import re
+import tempfile
 from . import api_bp
-from keybrame.core.image import calculate_gif_duration
+from keybrame.core import analysis
+from keybrame.core.assets import asset_cache, build_asset_manifest
+from keybrame.core.atlas import build_atlas
+from keybrame.core.gallery import image_index
+from keybrame.core.watcher import asset_watcher
 from keybrame.utils import paths
 
 config_manager = None
+socketio = None
 
 
 @api_bp.route('/images', methods=['GET'])
 def get_images():
+    """Gallery listing, from the incremental image index.
+
+    Optional query params: type (comma separated, e.g. gif,png), offset and
+    limit. The total before paging goes in X-Total-Count. Responses carry
+    Last-Modified and an ETag, so unchanged listings are answered with 304.
+    """
     try:
-        images_dir = paths.get_images_dir()
-        if not os.path.exists(images_dir):
-            return jsonify([])
+        types = {t.strip().lower() for t in request.args.get('type', '').split(',') if t.strip()}
+        offset = max(request.args.get('offset', 0, type=int), 0)
+        limit = request.args.get('limit', type=int)
+        if limit is not None and limit < 0:
+            return jsonify({'error': 'limit debe ser positivo'}), 400
 
-        images = []
-        for filename in os.listdir(images_dir):
-            filepath = os.path.join(images_dir, filename)
+        total, images = image_index.list(types, offset, limit)
 
-            if not os.path.isfile(filepath):
-                continue
+        response = jsonify(images)
+        response.headers['X-Total-Count'] = str(total)
+        response.last_modified = image_index.last_modified
+        response.set_etag(f"{image_index.last_modified}-{','.join(sorted(types))}-{offset}-{limit}")
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
 
-            _, ext = os.path.splitext(filename)
-            ext = ext.lower()
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-            if ext not in ['.png', '.jpg', '.jpeg', '.gif', '.webp', '.bmp']:
-                continue
 
-            size = os.path.getsize(filepath)
-            duration = calculate_gif_duration(filepath) if ext == '.gif' else None
+@api_bp.route('/assets/manifest', methods=['GET'])
+def get_asset_manifest():
+    """Images referenced by the active config, for overlays to preload"""
+    try:
+        return jsonify(build_asset_manifest(config_manager.get_config()))
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-            images.append({
-                'path': f"assets/{filename}",
-                'filename': filename,
-                'size': size,
-                'type': ext[1:],
-                'duration': duration
-            })
 
-        images.sort(key=lambda x: x['filename'].lower())
-        return jsonify(images)
+@api_bp.route('/assets/atlas', methods=['GET'])
+def get_asset_atlas():
+    """Sprite sheets and coordinate map of the small static images of the config"""
+    try:
+        return jsonify(build_atlas(config_manager.get_config()))
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+ALLOWED_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.gif', '.webp', '.bmp'}
+_UPLOAD_PREFIX = '.upload-'
+_UPLOAD_SUFFIX = '.tmp'
+
+
+def _upload_stream_factory(images_dir, temp_files):
+    """Multipart file parts are written as they arrive to temp files in the images folder"""
+    def factory(total_content_length, content_type, filename, content_length=None):
+        temp_file = tempfile.NamedTemporaryFile(
+            dir=images_dir, prefix=_UPLOAD_PREFIX, suffix=_UPLOAD_SUFFIX, delete=False
+        )
+        temp_files.append(temp_file)
+        return temp_file
+    return factory
+
+
+def _next_free_name(filename, taken):
+    """filename, or base_N.ext with the first N after the existing ones (taken is lowercase)"""
+    if filename.lower() not in taken:
+        return filename
+
+    base, ext = os.path.splitext(filename)
+    pattern = re.compile(re.escape(base.lower()) + r'_(\d+)' + re.escape(ext.lower()) + '$')
+    counters = [int(match.group(1)) for match in map(pattern.match, taken) if match]
+    return f"{base}_{max(counters, default=0) + 1}{ext}"
+
+
+def _commit_upload(temp_path, target):
+    """Moves an upload into place atomically, raising FileExistsError instead of overwriting"""
+    if os.name == 'nt':
+        # os.rename never replaces an existing file on Windows
+        os.rename(temp_path, target)
+    else:
+        try:
+            os.link(temp_path, target)
+        except FileExistsError:
+            raise
+        except OSError:
+            # Filesystems without hard links
+            if os.path.exists(target):
+                raise FileExistsError(target)
+            os.replace(temp_path, target)
+            return
+        os.unlink(temp_path)
+
+
+def _on_image_analyzed(result):
+    image_index.update(result['filename'], duration=result['duration'])
+    if socketio:
+        socketio.emit('image_analyzed', result)
+
+
+analysis.add_listener(_on_image_analyzed)
+
+
 @api_bp.route('/images/upload', methods=['POST'])
 def upload_image():
+    """Uploads one or more images ('file' fields).
+
+    File bodies are streamed to disk while the request is parsed and only
+    renamed into the images folder once complete. Metadata is computed in the
+    background; an 'image_analyzed' socket event is sent for each file.
+    """
+    images_dir = paths.get_images_dir()
+    temp_files = []
     try:
-        if 'file' not in request.files:
-            return jsonify({'error': 'No file provided'}), 400
+        if not os.path.exists(images_dir):
+            os.makedirs(images_dir)
 
-        file = request.files['file']
+        _, _, files = parse_form_data(
+            request.environ,
+            stream_factory=_upload_stream_factory(images_dir, temp_files),
+            max_content_length=request.max_content_length
+        )
+        uploads = [file for file in files.getlist('file') if file.filename]
 
-        if file.filename == '':
-            return jsonify({'error': 'No file selected'}), 400
+        if not uploads:
+            return jsonify({'error': 'No file provided'}), 400
 
-        allowed_extensions = {'.png', '.jpg', '.jpeg', '.gif', '.webp', '.bmp'}
-        filename = file.filename
-        _, ext = os.path.splitext(filename)
-        ext = ext.lower()
+        taken = {name.lower() for name in os.listdir(images_dir)}
+        uploaded = []
+        errors = []
 
-        if ext not in allowed_extensions:
-            return jsonify({'error': f'Invalid file type. Allowed: {", ".join(allowed_extensions)}'}), 400
+        for file in uploads:
+            filename = os.path.basename(file.filename.replace('\\', '/'))
+            _, ext = os.path.splitext(filename)
+            ext = ext.lower()
 
-        images_dir = paths.get_images_dir()
-        if not os.path.exists(images_dir):
-            os.makedirs(images_dir)
+            if ext not in ALLOWED_EXTENSIONS or filename.startswith('.'):
+                errors.append({
+                    'filename': file.filename,
+                    'error': f'Invalid file type. Allowed: {", ".join(ALLOWED_EXTENSIONS)}'
+                })
+                continue
 
-        filepath = os.path.join(images_dir, filename)
+            file.stream.flush()
+            file.stream.close()
+            temp_path = file.stream.name
 
-        # Append a number if file already exists
-        if os.path.exists(filepath):
-            base, ext = os.path.splitext(filename)
-            counter = 1
-            while os.path.exists(filepath):
-                filename = f"{base}_{counter}{ext}"
-                filepath = os.path.join(images_dir, filename)
-                counter += 1
+            while True:
+                filename = _next_free_name(filename, taken)
+                try:
+                    _commit_upload(temp_path, os.path.join(images_dir, filename))
+                    break
+                except FileExistsError:
+                    # Created by someone else since the listing
+                    taken.add(filename.lower())
+            taken.add(filename.lower())
 
-        file.save(filepath)
+            filepath = os.path.join(images_dir, filename)
+            asset_cache.invalidate(filepath)
+            image_index.add(filepath)
+            asset_watcher.refresh(filename)
+            analysis.schedule(filepath)
 
-        duration = calculate_gif_duration(filepath) if ext == '.gif' else None
+            uploaded.append({
+                'filename': filename,
+                'path': f"assets/{filename}",
+                'size': os.path.getsize(filepath),
+                'type': ext[1:],
+                'duration': None,
+                'analyzing': True
+            })
+
+        if len(uploads) == 1:
+            if errors:
+                return jsonify({'error': errors[0]['error']}), 400
+            return jsonify({'success': True, **uploaded[0]}), 201
 
         return jsonify({
-            'success': True,
-            'filename': filename,
-            'path': f"assets/{filename}",
-            'size': os.path.getsize(filepath),
-            'type': ext[1:],
-            'duration': duration
-        }), 201
+            'success': not errors,
+            'uploaded': uploaded,
+            'errors': errors
+        }), 201 if uploaded else 400
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+    finally:
+        for temp_file in temp_files:
+            temp_file.close()
+            if os.path.exists(temp_file.name):
+                os.remove(temp_file.name)
+
 
 @api_bp.route('/images/<path:filename>', methods=['DELETE'])
 def delete_image(filename):
@@ -115,6 +227,9 @@ def delete_image(filename):
             return jsonify({'error': 'Invalid path'}), 400
 
         os.remove(filepath)
+        asset_cache.invalidate(filepath)
+        image_index.remove(os.path.basename(filepath))
+        asset_watcher.refresh(os.path.basename(filepath))
         return jsonify({'success': True})
 
     except Exception as e:
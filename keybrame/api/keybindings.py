@@ -1,6 +1,5 @@
 from flask import jsonify, request
 import json
-import sqlite3
 from . import api_bp
 from .validation import validate_keybinding_data
 from keybrame.core.image import calculate_gif_duration
@@ -8,50 +7,24 @@ from keybrame.core.image import calculate_gif_duration
 config_manager = None
 
 
+def fill_transition_durations(data):
+    """Fills in missing transition durations from the image files.
+
+    Must run before the first write statement: a metadata cache miss stores
+    the result in the database, which would wait on the caller's own open
+    write transaction.
+    """
+    for direction in ('transition_in', 'transition_out'):
+        trans = data.get(direction)
+        if isinstance(trans, dict) and 'image' in trans and trans.get('duration') is None:
+            trans['duration'] = calculate_gif_duration(trans['image'])
+
+
 @api_bp.route('/keybindings', methods=['GET'])
 def get_keybindings():
     try:
         conn = config_manager.get_connection()
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-
-        cursor.execute('''
-            SELECT id, keys, type, image, description, priority, enabled
-            FROM keybindings
-            ORDER BY priority DESC, id
-        ''')
-
-        keybindings = []
-        for row in cursor.fetchall():
-            kb = {
-                'id': row['id'],
-                'keys': json.loads(row['keys']),
-                'type': row['type'],
-                'image': row['image'],
-                'description': row['description'] or '',
-                'priority': row['priority'],
-                'enabled': bool(row['enabled'])
-            }
-
-            cursor.execute('''
-                SELECT direction, image, duration
-                FROM transitions
-                WHERE keybinding_id = ?
-            ''', (row['id'],))
-
-            for trans_row in cursor.fetchall():
-                direction = trans_row['direction']
-                trans_data = {'image': trans_row['image']}
-                if trans_row['duration'] is not None:
-                    trans_data['duration'] = trans_row['duration']
-
-                if direction == 'in':
-                    kb['transition_in'] = trans_data
-                elif direction == 'out':
-                    kb['transition_out'] = trans_data
-
-            keybindings.append(kb)
-
+        keybindings = config_manager.fetch_keybindings(conn)
         conn.close()
         return jsonify(keybindings)
 
@@ -68,6 +41,8 @@ def create_keybinding():
         if not valid:
             return jsonify({'error': 'Datos inválidos', 'details': errors}), 400
 
+        fill_transition_durations(data)
+
         conn = config_manager.get_connection()
         cursor = conn.cursor()
 
@@ -89,9 +64,7 @@ def create_keybinding():
 
         if 'transition_in' in data and data['transition_in']:
             trans = data['transition_in']
-            duration = trans.get('duration')
-            if duration is None:
-                duration = calculate_gif_duration(trans['image'])
+            duration = trans['duration']
             cursor.execute('''
                 INSERT INTO transitions (keybinding_id, direction, image, duration)
                 VALUES (?, ?, ?, ?)
@@ -99,9 +72,7 @@ def create_keybinding():
 
         if 'transition_out' in data and data['transition_out']:
             trans = data['transition_out']
-            duration = trans.get('duration')
-            if duration is None:
-                duration = calculate_gif_duration(trans['image'])
+            duration = trans['duration']
             cursor.execute('''
                 INSERT INTO transitions (keybinding_id, direction, image, duration)
                 VALUES (?, ?, ?, ?)
@@ -125,6 +96,8 @@ def update_keybinding(kb_id):
         if not valid:
             return jsonify({'error': 'Datos inválidos', 'details': errors}), 400
 
+        fill_transition_durations(data)
+
         conn = config_manager.get_connection()
         cursor = conn.cursor()
 
@@ -174,9 +147,7 @@ def update_keybinding(kb_id):
             )
             if data['transition_in']:
                 trans = data['transition_in']
-                duration = trans.get('duration')
-                if duration is None:
-                    duration = calculate_gif_duration(trans['image'])
+                duration = trans['duration']
                 cursor.execute('''
                     INSERT INTO transitions (keybinding_id, direction, image, duration)
                     VALUES (?, ?, ?, ?)
@@ -189,9 +160,7 @@ def update_keybinding(kb_id):
             )
             if data['transition_out']:
                 trans = data['transition_out']
-                duration = trans.get('duration')
-                if duration is None:
-                    duration = calculate_gif_duration(trans['image'])
+                duration = trans['duration']
                 cursor.execute('''
                     INSERT INTO transitions (keybinding_id, direction, image, duration)
                     VALUES (?, ?, ?, ?)
@@ -243,12 +212,10 @@ def reorder_keybindings():
         cursor = conn.cursor()
 
         # Higher index = higher priority
-        for idx, kb_id in enumerate(order):
-            priority = len(order) - idx
-            cursor.execute(
-                "UPDATE keybindings SET priority = ? WHERE id = ?",
-                (priority, kb_id)
-            )
+        cursor.executemany(
+            "UPDATE keybindings SET priority = ? WHERE id = ?",
+            [(len(order) - idx, kb_id) for idx, kb_id in enumerate(order)]
+        )
 
         conn.commit()
         conn.close()
@@ -257,3 +224,246 @@ def reorder_keybindings():
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+
+# ========== BATCH ==========
+# Each batch endpoint validates every item first and then applies all of them
+# in a single transaction; if any item is invalid nothing is written. The
+# response has one result per item, in request order.
+
+_UPDATABLE_FIELDS = ('keys', 'type', 'image', 'description', 'enabled')
+
+
+def _column_value(field, value):
+    if field == 'keys':
+        return json.dumps(value)
+    if field == 'enabled':
+        return 1 if value else 0
+    return value
+
+
+def _transition_rows(kb_id, data):
+    """Rows for the transitions table; call fill_transition_durations() first"""
+    rows = []
+    for direction in ['in', 'out']:
+        trans = data.get(f'transition_{direction}')
+        if trans:
+            rows.append((kb_id, direction, trans['image'], trans['duration']))
+    return rows
+
+
+def _existing_ids(cursor, ids):
+    # json_each avoids the limit on the number of ? parameters
+    cursor.execute(
+        "SELECT id FROM keybindings WHERE id IN (SELECT value FROM json_each(?))",
+        (json.dumps(list(ids)),)
+    )
+    return {row[0] for row in cursor.fetchall()}
+
+
+def _batch_error(results):
+    return jsonify({'error': 'Datos inválidos', 'results': results}), 400
+
+
+@api_bp.route('/keybindings/batch', methods=['POST'])
+def create_keybindings_batch():
+    """Creates keybindings in one transaction. Body: {"items": [keybinding, ...]}
+
+    Priorities are assigned as if the items were created one at a time.
+    """
+    conn = None
+    try:
+        items = (request.json or {}).get('items')
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'items debe ser un array no vacío'}), 400
+
+        results = []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                results.append({'index': index, 'success': False, 'details': ['Cada item debe ser un objeto']})
+                continue
+            valid, errors = validate_keybinding_data(item)
+            result = {'index': index, 'success': valid}
+            if not valid:
+                result['details'] = errors
+            results.append(result)
+
+        if not all(result['success'] for result in results):
+            return _batch_error(results)
+
+        # Everything but the ids and priorities is prepared before taking the
+        # write lock; durations may have to be read from the image files
+        for item in items:
+            fill_transition_durations(item)
+        keybinding_rows = [
+            (json.dumps(item['keys']), item['type'], item['image'], item.get('description', ''))
+            for item in items
+        ]
+        transition_rows = [row for index, item in enumerate(items) for row in _transition_rows(index, item)]
+
+        conn = config_manager.get_connection()
+        cursor = conn.cursor()
+        # Take the write lock now, so the ids below cannot be taken meanwhile
+        cursor.execute("BEGIN IMMEDIATE")
+
+        cursor.execute("SELECT COALESCE(MAX(priority), 0) FROM keybindings")
+        max_priority = cursor.fetchone()[0]
+        cursor.execute('''
+            SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'keybindings'), 0),
+                       COALESCE(MAX(id), 0))
+            FROM keybindings
+        ''')
+        first_id = cursor.fetchone()[0] + 1
+
+        cursor.executemany('''
+            INSERT INTO keybindings (id, keys, type, image, description, priority)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', [
+            (first_id + index, *row, max_priority + 1 + index)
+            for index, row in enumerate(keybinding_rows)
+        ])
+
+        cursor.executemany('''
+            INSERT INTO transitions (keybinding_id, direction, image, duration)
+            VALUES (?, ?, ?, ?)
+        ''', [(first_id + index, *row) for index, *row in transition_rows])
+
+        conn.commit()
+
+        for result in results:
+            result['id'] = first_id + result['index']
+        return jsonify({'success': True, 'results': results}), 201
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    finally:
+        if conn:
+            conn.close()
+
+
+@api_bp.route('/keybindings/batch', methods=['PATCH'])
+def update_keybindings_batch():
+    """Updates keybindings in one transaction. Body: {"items": [{"id": 1, ...fields}, ...]}
+
+    Items take the same fields as PUT /keybindings/<id>, e.g. {"id": 3, "enabled": false}.
+    """
+    conn = None
+    try:
+        items = (request.json or {}).get('items')
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'items debe ser un array no vacío'}), 400
+
+        conn = config_manager.get_connection()
+        cursor = conn.cursor()
+
+        ids = [item.get('id') for item in items if isinstance(item, dict)]
+        existing = _existing_ids(cursor, [kb_id for kb_id in ids if isinstance(kb_id, int)])
+
+        results = []
+        seen = set()
+        for index, item in enumerate(items):
+            if not isinstance(item, dict) or not isinstance(item.get('id'), int):
+                results.append({'index': index, 'success': False, 'details': ['Cada item necesita un id entero']})
+                continue
+
+            kb_id = item['id']
+            valid, errors = validate_keybinding_data(item, is_update=True)
+            if kb_id not in existing:
+                errors.append('Keybinding no encontrado')
+            elif kb_id in seen:
+                errors.append('id repetido en el lote')
+            seen.add(kb_id)
+
+            result = {'index': index, 'id': kb_id, 'success': not errors}
+            if errors:
+                result['details'] = errors
+            results.append(result)
+
+        if not all(result['success'] for result in results):
+            return _batch_error(results)
+
+        # Rows are prepared before taking the write lock, since durations may
+        # have to be read from the image files. One executemany per distinct
+        # set of updated columns
+        updates = {}
+        for item in items:
+            fields = tuple(field for field in _UPDATABLE_FIELDS if field in item)
+            values = [_column_value(field, item[field]) for field in fields]
+            updates.setdefault(fields, []).append((*values, item['id']))
+
+        cleared_transitions = [
+            (item['id'], direction) for item in items for direction in ['in', 'out']
+            if f'transition_{direction}' in item
+        ]
+        for item in items:
+            fill_transition_durations(item)
+        transition_rows = [row for item in items for row in _transition_rows(item['id'], item)]
+
+        cursor.execute("BEGIN IMMEDIATE")
+
+        for fields, rows in updates.items():
+            assignments = ''.join(f"{field} = ?, " for field in fields)
+            cursor.executemany(f'''
+                UPDATE keybindings
+                SET {assignments}updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', rows)
+
+        cursor.executemany(
+            "DELETE FROM transitions WHERE keybinding_id = ? AND direction = ?",
+            cleared_transitions
+        )
+        cursor.executemany('''
+            INSERT INTO transitions (keybinding_id, direction, image, duration)
+            VALUES (?, ?, ?, ?)
+        ''', transition_rows)
+
+        conn.commit()
+        return jsonify({'success': True, 'results': results})
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    finally:
+        if conn:
+            conn.close()
+
+
+@api_bp.route('/keybindings/batch', methods=['DELETE'])
+def delete_keybindings_batch():
+    """Deletes keybindings in one transaction. Body: {"ids": [1, 2, ...]}"""
+    conn = None
+    try:
+        ids = (request.json or {}).get('ids')
+        if not isinstance(ids, list) or not ids:
+            return jsonify({'error': 'ids debe ser un array no vacío'}), 400
+
+        conn = config_manager.get_connection()
+        cursor = conn.cursor()
+        existing = _existing_ids(cursor, [kb_id for kb_id in ids if isinstance(kb_id, int)])
+
+        results = []
+        for index, kb_id in enumerate(ids):
+            if not isinstance(kb_id, int):
+                results.append({'index': index, 'success': False, 'details': ['id debe ser un entero']})
+            elif kb_id not in existing:
+                results.append({'index': index, 'id': kb_id, 'success': False, 'details': ['Keybinding no encontrado']})
+            else:
+                results.append({'index': index, 'id': kb_id, 'success': True})
+
+        if not all(result['success'] for result in results):
+            return _batch_error(results)
+
+        # Transitions are removed automatically via CASCADE
+        cursor.executemany("DELETE FROM keybindings WHERE id = ?", [(kb_id,) for kb_id in set(ids)])
+
+        conn.commit()
+        return jsonify({'success': True, 'results': results})
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+    finally:
+        if conn:
+            conn.close()
@@ -7,6 +7,7 @@ import pathlib
 from . import api_bp
 
 config_manager = None
+keyboard_handler = None
 
 
 @api_bp.route('/version', methods=['GET'])
@@ -15,6 +16,17 @@ def get_version():
     return jsonify({'version': __version__})
 
 
+@api_bp.route('/server/stats', methods=['GET'])
+def get_server_stats():
+    from keybrame.core.assets import asset_cache
+    from keybrame.core.watcher import asset_watcher
+    return jsonify({
+        'input': keyboard_handler.get_stats() if keyboard_handler else None,
+        'assets': asset_cache.get_stats(),
+        'watcher': {'backend': asset_watcher.backend, 'files': len(asset_watcher.files())}
+    })
+
+
 @api_bp.route('/server/update', methods=['POST'])
 def trigger_update():
     try:
@@ -2,6 +2,10 @@ from flask import jsonify, request
 import json
 import os
 from . import api_bp
+from keybrame.core.assets import build_asset_manifest, collect_config_images
+from keybrame.core.atlas import get_config_atlas
+from keybrame.core.events import OVERLAY_ROOM
+from keybrame.core.runtime import SERVER_MODES
 from keybrame.utils import paths
 
 config_manager = None
@@ -61,6 +65,82 @@ def update_settings():
                 (json.dumps(data['shutdown_combo']),)
             )
 
+        if 'key_event_window_ms' in data:
+            window = data['key_event_window_ms']
+            if not isinstance(window, int) or window < 0 or window > 1000:
+                conn.close()
+                return jsonify({'error': 'key_event_window_ms debe ser un entero entre 0 y 1000'}), 400
+
+            cursor.execute(
+                "INSERT OR REPLACE INTO settings (key, value, type) VALUES ('key_event_window_ms', ?, 'integer')",
+                (str(window),)
+            )
+
+        if 'variant_widths' in data:
+            widths = data['variant_widths']
+            if not isinstance(widths, list) or not all(isinstance(w, int) and 16 <= w <= 8192 for w in widths):
+                conn.close()
+                return jsonify({'error': 'variant_widths debe ser una lista de anchos entre 16 y 8192'}), 400
+
+            cursor.execute(
+                "INSERT OR REPLACE INTO settings (key, value, type) VALUES ('variant_widths', ?, 'array')",
+                (json.dumps(sorted(set(widths))),)
+            )
+
+        if 'atlas_mode' in data:
+            atlas_mode = data['atlas_mode']
+            if atlas_mode not in (0, 1):
+                conn.close()
+                return jsonify({'error': 'atlas_mode debe ser 0 o 1'}), 400
+
+            cursor.execute(
+                "INSERT OR REPLACE INTO settings (key, value, type) VALUES ('atlas_mode', ?, 'integer')",
+                (str(int(atlas_mode)),)
+            )
+
+        if 'server_mode' in data:
+            server_mode = data['server_mode']
+            if server_mode not in SERVER_MODES:
+                conn.close()
+                return jsonify({'error': f'server_mode debe ser uno de: {", ".join(SERVER_MODES)}'}), 400
+
+            cursor.execute("SELECT value FROM settings WHERE key = 'server_mode'")
+            current_mode = cursor.fetchone()
+            if (current_mode[0] if current_mode else 'threading') != server_mode:
+                reload_required = True
+
+            cursor.execute(
+                "INSERT OR REPLACE INTO settings (key, value, type) VALUES ('server_mode', ?, 'string')",
+                (server_mode,)
+            )
+
+        if 'websocket_only' in data:
+            websocket_only = data['websocket_only']
+            if websocket_only not in (0, 1):
+                conn.close()
+                return jsonify({'error': 'websocket_only debe ser 0 o 1'}), 400
+
+            cursor.execute("SELECT value FROM settings WHERE key = 'websocket_only'")
+            current = cursor.fetchone()
+            if int(current[0] if current else 0) != websocket_only:
+                reload_required = True
+
+            cursor.execute(
+                "INSERT OR REPLACE INTO settings (key, value, type) VALUES ('websocket_only', ?, 'integer')",
+                (str(int(websocket_only)),)
+            )
+
+        if 'transition_retrigger' in data:
+            # cancel: new input cuts the running transition; chain: it waits for the end
+            if data['transition_retrigger'] not in ('cancel', 'chain'):
+                conn.close()
+                return jsonify({'error': "transition_retrigger debe ser 'cancel' o 'chain'"}), 400
+
+            cursor.execute(
+                "INSERT OR REPLACE INTO settings (key, value, type) VALUES ('transition_retrigger', ?, 'string')",
+                (data['transition_retrigger'],)
+            )
+
         if 'default_image' in data:
             default_image = data['default_image']
 
@@ -91,18 +171,47 @@ def update_settings():
         return jsonify({'error': str(e)}), 500
 
 
-@api_bp.route('/reload', methods=['POST'])
-def reload_config():
-    try:
-        config_manager.reload()
+def publish_config_changes(notify_unchanged=False):
+    """Applies pending config changes and notifies the app and clients.
 
-        if reload_global_config:
-            reload_global_config()
+    Returns (changed, version). Cheap when nothing changed, so it runs after
+    every write request (see auto_reload_after_write).
+    """
+    previous = config_manager.get_config()
+    config = config_manager.reload()
+    changed = config is not previous
 
-        if socketio:
-            socketio.emit('config_reloaded', {})
+    if changed and reload_global_config:
+        reload_global_config()
+
+    if socketio and (changed or notify_unchanged):
+        socketio.emit('config_reloaded', {'version': config_manager.version, 'changed': changed})
+        # Overlays only need a new manifest if the set of images changed
+        images_changed = collect_config_images(config) != collect_config_images(previous)
+        if images_changed or config.get('atlas_mode') != previous.get('atlas_mode'):
+            socketio.emit('asset_manifest', build_asset_manifest(config), to=OVERLAY_ROOM)
+            socketio.emit('atlas', get_config_atlas(config), to=OVERLAY_ROOM)
+
+    return changed, config_manager.version
+
+
+@api_bp.after_request
+def auto_reload_after_write(response):
+    """Every successful write publishes the new config, no /api/reload needed"""
+    if (request.method in ('POST', 'PUT', 'PATCH', 'DELETE') and response.status_code < 400
+            and request.endpoint != 'api.reload_config' and config_manager):
+        try:
+            publish_config_changes()
+        except Exception as e:
+            print(f"[WARNING] No se pudo publicar la configuración: {e}")
+    return response
 
-        return jsonify({'success': True})
+
+@api_bp.route('/reload', methods=['POST'])
+def reload_config():
+    try:
+        changed, version = publish_config_changes(notify_unchanged=True)
+        return jsonify({'success': True, 'version': version, 'changed': changed})
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -122,13 +231,16 @@ def export_config():
 def import_config():
     try:
         from .validation import validate_keybinding_data
-        from keybrame.core.image import calculate_gif_duration
+        from .keybindings import fill_transition_durations
 
         data = request.json
 
         if 'port' not in data or 'keybindings' not in data:
             return jsonify({'error': 'JSON inválido: faltan campos requeridos'}), 400
 
+        for binding in data['keybindings']:
+            fill_transition_durations(binding)
+
         conn = config_manager.get_connection()
         cursor = conn.cursor()
 
@@ -173,9 +285,7 @@ def import_config():
 
             if 'transition_in' in binding:
                 trans = binding['transition_in']
-                duration = trans.get('duration')
-                if duration is None:
-                    duration = calculate_gif_duration(trans['image'])
+                duration = trans['duration']
                 cursor.execute('''
                     INSERT INTO transitions (keybinding_id, direction, image, duration)
                     VALUES (?, ?, ?, ?)
@@ -183,9 +293,7 @@ def import_config():
 
             if 'transition_out' in binding:
                 trans = binding['transition_out']
-                duration = trans.get('duration')
-                if duration is None:
-                    duration = calculate_gif_duration(trans['image'])
+                duration = trans['duration']
                 cursor.execute('''
                     INSERT INTO transitions (keybinding_id, direction, image, duration)
                     VALUES (?, ?, ?, ?)
@@ -194,8 +302,6 @@ def import_config():
         conn.commit()
         conn.close()
 
-        config_manager.reload()
-
         return jsonify({'success': True})
 
     except Exception as e:
@@ -1,18 +1,5 @@
-import os
-from keybrame.utils import paths
-
-VALID_KEYS = [
-    *[chr(i) for i in range(ord('a'), ord('z')+1)],
-    *[str(i) for i in range(10)],
-    'space', 'enter', 'tab', 'esc', 'backspace',
-    'ctrl', 'shift', 'alt', 'cmd',
-    'up', 'down', 'left', 'right',
-    *[f'f{i}' for i in range(1, 13)],
-    *[f'num_{i}' for i in range(10)],
-    'num_add', 'num_subtract', 'num_multiply', 'num_divide',
-    'mouse_left', 'mouse_right', 'mouse_middle',
-    'scroll_up', 'scroll_down'
-]
+from keybrame.core.keymask import VALID_KEYS
+from keybrame.core.watcher import asset_watcher
 
 def validate_keys(keys):
     if not isinstance(keys, list) or len(keys) == 0:
@@ -31,10 +18,8 @@ def validate_image_exists(image_path):
     # Extraer solo el filename (sin el prefijo assets/)
     filename = image_path.replace('assets/', '').replace('img/', '').replace('images/', '')
 
-    # Construir path absoluto
-    full_path = os.path.join(paths.get_images_dir(), filename)
-
-    if not os.path.exists(full_path):
+    # In-memory listing kept by the folder watcher
+    if not asset_watcher.exists(filename):
         return False, f"Imagen no encontrada: {filename}. Por favor, sube la imagen primero."
 
     return True, None
@@ -1,10 +1,25 @@
 import os
 import json
-from flask import Flask, send_from_directory, Response
-from flask_socketio import SocketIO, emit
+import hashlib
+import threading
+from flask import Flask, send_from_directory, send_file, Response, request, redirect
+from flask_socketio import SocketIO, emit, join_room, leave_room
 from flask_cors import CORS
-from keybrame.api import api_bp, init_api
+from werkzeug.security import safe_join
+from keybrame.api import api_bp, init_api, set_keyboard_handler as set_api_keyboard_handler
+from keybrame.core.assets import (asset_cache, build_asset_manifest, collect_config_images, get_asset_url,
+                                  get_content_hash, split_asset_url, IMMUTABLE_MAX_AGE)
+from keybrame.core import variants
+from keybrame.core import atlas
+from keybrame.core.atlas import get_atlas_dir, get_config_atlas
+from keybrame.core.gallery import image_index, IMAGE_EXTENSIONS
+from keybrame.core.watcher import asset_watcher
+from keybrame.core.runtime import bridge_emits, DEFAULT_SERVER_MODE
+from keybrame.core.stream import OverlayStream, state_frame
+from keybrame.core.display import DisplayState
+from keybrame.core.events import OVERLAY_ROOM, KEYS_ROOM, CHANNELS
 from keybrame.utils import paths
+from keybrame.utils.vendor import VENDOR_FILES, get_vendor_dir
 
 
 def generate_placeholder_svg():
@@ -20,7 +35,7 @@ def generate_placeholder_svg():
     return svg
 
 
-def create_app(config_manager, keyboard_handler=None):
+def create_app(config_manager, keyboard_handler=None, async_mode=DEFAULT_SERVER_MODE):
     static_folder = paths.get_static_dir()
     images_folder = paths.get_images_dir()
 
@@ -28,18 +43,78 @@ def create_app(config_manager, keyboard_handler=None):
     app.config['SECRET_KEY'] = 'obs-image-switcher-secret'
     CORS(app)
 
-    socketio = SocketIO(app, cors_allowed_origins="*")
+    # websocket_only skips the long-polling handshake; pages load matching
+    # client options from /socket-options.js (needs a restart, like the port)
+    websocket_only = bool(config_manager.get_config().get('websocket_only'))
+    transports = ['websocket'] if websocket_only else ['polling', 'websocket']
+    socket_options_js = f"window.SOCKET_OPTIONS = {json.dumps({'transports': transports} if websocket_only else {})};\n"
+
+    socketio = SocketIO(app, cors_allowed_origins="*", async_mode=async_mode, transports=transports)
+    overlay_stream = OverlayStream(socketio)
+    overlay_stream.tap()
+    bridge_emits(socketio)
 
     _keyboard_handler = {'handler': keyboard_handler}
+    # sids in KEYS_ROOM; kept here because clients can subscribe before the
+    # keyboard handler exists (it starts after the port is open)
+    key_subscribers = set()
+    if keyboard_handler:
+        keyboard_handler.key_subscribers = key_subscribers
+
+    variants.configure(config_manager.get_config().get('variant_widths', []))
+
+    def on_assets_changed(changed, removed):
+        for filename in changed | removed:
+            asset_cache.invalidate(os.path.join(images_folder, filename))
+
+        changed_images = sorted(f for f in changed if os.path.splitext(f)[1].lower() in IMAGE_EXTENSIONS)
+        removed_images = sorted(f for f in removed if os.path.splitext(f)[1].lower() in IMAGE_EXTENSIONS)
+        if not changed_images and not removed_images:
+            return
+
+        for filename in changed_images + removed_images:
+            variants.schedule(os.path.join(images_folder, filename))
+        if _keyboard_handler['handler']:
+            _keyboard_handler['handler'].reset_asset_urls()
+
+        socketio.emit('assets_changed', {
+            'changed': [f"assets/{f}" for f in changed_images],
+            'removed': [f"assets/{f}" for f in removed_images]
+        })
+
+        # Overlays only care about the images of the active config
+        config = config_manager.get_config()
+        config_images = set(collect_config_images(config))
+        if any(f"assets/{f}" in config_images for f in changed_images + removed_images):
+            socketio.emit('asset_manifest', build_asset_manifest(config), to=OVERLAY_ROOM)
+            socketio.emit('atlas', get_config_atlas(config), to=OVERLAY_ROOM)
+
+    # The watcher keeps the gallery index and validation in memory and
+    # invalidates cached assets, so entries can go longer between stat checks
+    image_index.watched = True
+    asset_watcher.add_listener(image_index.apply_changes)
+    asset_watcher.add_listener(on_assets_changed)
+    asset_watcher.start()
+    asset_cache.revalidate_interval = 30.0
+    # Initial gallery load, so the admin panel does not wait for it
+    threading.Thread(target=lambda: image_index.sync(asset_watcher.files()), daemon=True).start()
+    # Variants of images replaced or deleted while the server was not running
+    threading.Thread(target=variants.prune, daemon=True).start()
+    if not config_manager.get_config().get('atlas_mode'):
+        # With atlas mode on, the next build keeps only its own sheets
+        atlas.prune()
 
     def reload_global_config():
         print("[INFO] Configuración global actualizada")
+        variants.configure(config_manager.get_config().get('variant_widths', []))
         if _keyboard_handler['handler']:
             _keyboard_handler['handler'].reload_config()
             print("[INFO] Keyboard handler recargado")
 
     def set_keyboard_handler(handler):
+        handler.key_subscribers = key_subscribers
         _keyboard_handler['handler'] = handler
+        set_api_keyboard_handler(handler)
 
     # Expose set_keyboard_handler on the app for access from server.py
     app.set_keyboard_handler = set_keyboard_handler
@@ -49,6 +124,14 @@ def create_app(config_manager, keyboard_handler=None):
 
     # ========== RUTAS FLASK ==========
 
+    def current_state():
+        """Snapshot of what the overlay should show, see keybrame.core.display"""
+        if _keyboard_handler['handler']:
+            return _keyboard_handler['handler'].get_display_state()
+        state = DisplayState(config_manager.get_config().get('default_image', '')).snapshot(get_asset_url)
+        state.update(active=[], held=[])
+        return state
+
     @app.route('/')
     def index():
         """OBS Browser Source main page"""
@@ -60,6 +143,37 @@ def create_app(config_manager, keyboard_handler=None):
     def admin_ui():
         return send_from_directory(static_folder, 'admin.html')
 
+    @app.route('/socket-options.js')
+    def socket_options():
+        """Socket.IO client options matching the server transports"""
+        response = Response(socket_options_js, mimetype='application/javascript')
+        response.cache_control.no_cache = True
+        return response
+
+    @app.route('/vendor/<path:filename>')
+    def serve_vendor(filename):
+        if filename not in VENDOR_FILES:
+            return Response('Not found', status=404)
+
+        vendor_dir = get_vendor_dir(static_folder)
+        if not os.path.isfile(os.path.join(vendor_dir, filename)):
+            # Not bundled (e.g. running from source without a build)
+            return redirect(VENDOR_FILES[filename])
+
+        # Names carry the version
+        response = send_from_directory(vendor_dir, filename, max_age=IMMUTABLE_MAX_AGE)
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+    @app.route('/events')
+    def overlay_events():
+        """Overlay image changes as Server-Sent Events, see keybrame.core.stream"""
+        response = Response(overlay_stream.stream(lambda: state_frame(current_state())), mimetype='text/event-stream')
+        response.cache_control.no_cache = True
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+
     @app.route('/static/<path:filename>')
     def serve_static(filename):
         return send_from_directory(static_folder, filename)
@@ -70,32 +184,80 @@ def create_app(config_manager, keyboard_handler=None):
         config = config_manager.get_config()
         return json.dumps(config)
 
+    placeholder_svg = generate_placeholder_svg()
+    placeholder_etag = hashlib.sha256(placeholder_svg.encode('utf-8')).hexdigest()[:16]
+
     @app.route('/assets/placeholder.svg')
     def serve_placeholder():
-        svg = generate_placeholder_svg()
-        return Response(svg, mimetype='image/svg+xml')
+        response = Response(placeholder_svg, mimetype='image/svg+xml')
+        response.set_etag(placeholder_etag)
+        # Also served for missing images, so always revalidate
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
 
     @app.route('/assets/<path:filename>')
     def serve_assets(filename):
+        requested_hash, filename = split_asset_url(filename)
         if filename == 'placeholder.svg':
             return serve_placeholder()
 
-        filepath = os.path.join(images_folder, filename)
-        if not os.path.exists(filepath):
+        filepath = safe_join(images_folder, filename)
+        entry = asset_cache.get(filepath) if filepath else None
+        if entry is None and not (filepath and os.path.isfile(filepath)):
             print(f"[WARNING] Imagen no encontrada: {filename}")
             return serve_placeholder()
-        return send_from_directory(images_folder, filename)
+
+        content_hash = entry['hash'] if entry is not None else get_content_hash(filepath)
+        immutable = requested_hash is not None and requested_hash == content_hash
+
+        # ?w=&h= asks for a pre-scaled variant that fits that box
+        box_width = request.args.get('w', type=int)
+        box_height = request.args.get('h', type=int)
+        variant, pending = variants.get_variant(filepath, box_width, box_height)
+        if variant:
+            filepath = variant
+            entry = asset_cache.get(variant)
+        elif pending:
+            # The original stands in until the variant is generated; caching
+            # it for good under this URL would mean never fetching the variant
+            immutable = False
+
+        if entry is not None:
+            response = Response(entry['data'], mimetype=entry['mimetype'])
+            response.set_etag(entry['hash'])
+        else:
+            response = send_file(filepath, etag=get_content_hash(filepath) or True)
+
+        if immutable:
+            # send_file() defaults to no-cache
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.no_cache = True
+        return response.make_conditional(request)
+
+    @app.route('/atlas/<path:filename>')
+    def serve_atlas(filename):
+        # Sheet names carry the hash of their contents
+        response = send_from_directory(get_atlas_dir(), filename, max_age=IMMUTABLE_MAX_AGE)
+        response.cache_control.immutable = True
+        return response
 
     # ========== WEBSOCKET HANDLERS ==========
 
     @socketio.on('connect')
     def handle_connect():
         print('[OK] Cliente conectado')
+        join_room(OVERLAY_ROOM)
+        # One message brings the client to the current image, instead of the
+        # default image until the next key event
+        emit('state', current_state())
         config = config_manager.get_config()
-        default_image = config.get('default_image', '')
-        if not default_image:
-            default_image = 'assets/placeholder.svg'
-        emit('image_change', {'image': default_image})
+        emit('asset_manifest', build_asset_manifest(config))
+        if config.get('atlas_mode'):
+            emit('atlas', get_config_atlas(config))
 
         from keybrame.core.updater import get_update_info
         update_info = get_update_info()
@@ -104,6 +266,34 @@ def create_app(config_manager, keyboard_handler=None):
 
     @socketio.on('disconnect')
     def handle_disconnect():
+        key_subscribers.discard(request.sid)
         print('[X] Cliente desconectado')
 
+    @socketio.on('get_state')
+    def handle_get_state(data=None):
+        """Resync after a client detects a gap in the sequence numbers"""
+        return current_state()
+
+    @socketio.on('subscribe')
+    def handle_subscribe(data):
+        channel = (data or {}).get('channel')
+        if channel not in CHANNELS:
+            return {'error': f'Canal inválido: {channel}'}
+
+        join_room(channel)
+        if channel == KEYS_ROOM:
+            key_subscribers.add(request.sid)
+        return {'success': True}
+
+    @socketio.on('unsubscribe')
+    def handle_unsubscribe(data):
+        channel = (data or {}).get('channel')
+        if channel not in CHANNELS:
+            return {'error': f'Canal inválido: {channel}'}
+
+        leave_room(channel)
+        if channel == KEYS_ROOM:
+            key_subscribers.discard(request.sid)
+        return {'success': True}
+
     return app, socketio
@@ -1,17 +1,28 @@
-import sqlite3
 import json
 import os
 import threading
 from datetime import datetime
-from keybrame.core.image import calculate_gif_duration
+from keybrame.core.image import calculate_gif_duration, init_metadata_cache
+from keybrame.config.pool import ConnectionPool
+from keybrame.config.snapshot import ConfigSnapshot, freeze
+
+# Above this many changed keybindings a reload reads the whole table instead
+_MAX_DELTA_BINDINGS = 500
 
 
 class ConfigManager:
     def __init__(self, db_path='config.db'):
         self.db_path = db_path
         self._lock = threading.Lock()
-        self._config_cache = None
+        self._snapshot = None
+        # Config version (last applied config_changes entry) and the state
+        # the published snapshot is assembled from, see reload()
+        self.version = 0
+        self._settings = {}
+        self._bindings = {}
+        self._pool = ConnectionPool(db_path)
         self._initialize_database()
+        init_metadata_cache(self.get_connection)
 
     def _initialize_database(self):
         db_exists = os.path.exists(self.db_path)
@@ -21,11 +32,13 @@ class ConfigManager:
             self._create_default_config()
             print("[INFO] Configuración por defecto creada")
         else:
+            # CREATE TABLE IF NOT EXISTS adds tables introduced by newer versions
+            self._create_tables()
             self._migrate_image_paths_if_needed()
             print("[INFO] Usando base de datos existente: config.db")
 
     def _create_tables(self):
-        conn = sqlite3.connect(self.db_path)
+        conn = self.get_connection()
         cursor = conn.cursor()
 
         cursor.execute('''
@@ -67,11 +80,47 @@ class ConfigManager:
             )
         ''')
 
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS image_metadata (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                duration INTEGER NOT NULL,
+                frames INTEGER NOT NULL,
+                width INTEGER,
+                height INTEGER,
+                format TEXT
+            )
+        ''')
+
+        # Change log filled by triggers, so every writer is tracked
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS config_changes (
+                version INTEGER PRIMARY KEY AUTOINCREMENT,
+                entity TEXT NOT NULL CHECK(entity IN ('setting', 'keybinding')),
+                entity_key TEXT NOT NULL,
+                changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        for table, entity, key_column in [('settings', 'setting', 'key'),
+                                          ('keybindings', 'keybinding', 'id'),
+                                          ('transitions', 'keybinding', 'keybinding_id')]:
+            for operation in ['INSERT', 'UPDATE', 'DELETE']:
+                row = 'OLD' if operation == 'DELETE' else 'NEW'
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS log_{table}_{operation.lower()}
+                    AFTER {operation} ON {table}
+                    BEGIN
+                        INSERT INTO config_changes (entity, entity_key) VALUES ('{entity}', {row}.{key_column});
+                    END
+                ''')
+
         conn.commit()
         conn.close()
 
     def _create_default_config(self):
-        conn = sqlite3.connect(self.db_path)
+        conn = self.get_connection()
         cursor = conn.cursor()
 
         cursor.execute(
@@ -86,13 +135,37 @@ class ConfigManager:
             "INSERT INTO settings (key, value, type) VALUES (?, ?, ?)",
             ('default_image', '', 'string')
         )
+        cursor.execute(
+            "INSERT INTO settings (key, value, type) VALUES (?, ?, ?)",
+            ('key_event_window_ms', '0', 'integer')
+        )
+        cursor.execute(
+            "INSERT INTO settings (key, value, type) VALUES (?, ?, ?)",
+            ('variant_widths', json.dumps([]), 'array')
+        )
+        cursor.execute(
+            "INSERT INTO settings (key, value, type) VALUES (?, ?, ?)",
+            ('atlas_mode', '0', 'integer')
+        )
+        cursor.execute(
+            "INSERT INTO settings (key, value, type) VALUES (?, ?, ?)",
+            ('server_mode', 'threading', 'string')
+        )
+        cursor.execute(
+            "INSERT INTO settings (key, value, type) VALUES (?, ?, ?)",
+            ('websocket_only', '0', 'integer')
+        )
+        cursor.execute(
+            "INSERT INTO settings (key, value, type) VALUES (?, ?, ?)",
+            ('transition_retrigger', 'cancel', 'string')
+        )
 
         conn.commit()
         conn.close()
 
     def _migrate_image_paths_if_needed(self):
         """Migra rutas de 'images/' o 'img/' a 'assets/' si es necesario (una sola vez)"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.get_connection()
         cursor = conn.cursor()
 
         cursor.execute("SELECT COUNT(*) FROM keybindings WHERE image LIKE 'images/%' OR image LIKE 'img/%'")
@@ -111,103 +184,227 @@ class ConfigManager:
 
         conn.close()
 
+    def _process_binding_transitions(self, binding):
+        for transition_type in ['transition_in', 'transition_out', 'transition']:
+            if transition_type in binding:
+                transition = binding[transition_type]
+                if 'duration' not in transition or transition['duration'] is None:
+                    image_path = transition['image']
+                    calculated_duration = calculate_gif_duration(image_path)
+                    transition['duration'] = calculated_duration
+                    if calculated_duration > 0:
+                        print(f"[INFO] Duración auto-detectada para {image_path}: {calculated_duration}ms")
+        return binding
+
     def _process_config_transitions(self, config):
         for binding in config.get('keybindings', []):
-            for transition_type in ['transition_in', 'transition_out', 'transition']:
-                if transition_type in binding:
-                    transition = binding[transition_type]
-                    if 'duration' not in transition or transition['duration'] is None:
-                        image_path = transition['image']
-                        calculated_duration = calculate_gif_duration(image_path)
-                        transition['duration'] = calculated_duration
-                        if calculated_duration > 0:
-                            print(f"[INFO] Duración auto-detectada para {image_path}: {calculated_duration}ms")
+            self._process_binding_transitions(binding)
         return config
 
-    def load_config(self):
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT key, value, type FROM settings")
-        settings = {}
-        for row in cursor.fetchall():
-            key = row['key']
-            value = row['value']
-            value_type = row['type']
-
-            if value_type == 'integer':
-                settings[key] = int(value)
-            elif value_type == 'array':
-                settings[key] = json.loads(value)
-            else:
-                settings[key] = value
+    def _parse_setting(self, value, value_type):
+        if value_type == 'integer':
+            return int(value)
+        elif value_type == 'array':
+            return json.loads(value)
+        return value
 
-        cursor.execute('''
-            SELECT id, keys, type, image, description, enabled
-            FROM keybindings
-            WHERE enabled = 1
-            ORDER BY priority DESC, id
-        ''')
-
-        keybindings = []
-        for row in cursor.fetchall():
-            keybinding = {
-                'keys': json.loads(row['keys']),
-                'type': row['type'],
-                'image': row['image']
-            }
-
-            if row['description']:
-                keybinding['description'] = row['description']
-
-            kb_id = row['id']
-            cursor.execute('''
-                SELECT direction, image, duration
-                FROM transitions
-                WHERE keybinding_id = ?
-            ''', (kb_id,))
-
-            for trans_row in cursor.fetchall():
-                direction = trans_row['direction']
-                trans_data = {
-                    'image': trans_row['image']
-                }
-                if trans_row['duration'] is not None:
-                    trans_data['duration'] = trans_row['duration']
+    def _load_settings(self, conn, keys=None):
+        if keys is None:
+            rows = conn.execute("SELECT key, value, type FROM settings").fetchall()
+        else:
+            rows = conn.execute(
+                f"SELECT key, value, type FROM settings WHERE key IN ({','.join('?' * len(keys))})",
+                list(keys)
+            ).fetchall()
+        return {key: self._parse_setting(value, value_type) for key, value, value_type in rows}
+
+    def _build_keybinding(self, kb):
+        keybinding = {
+            'keys': kb['keys'],
+            'type': kb['type'],
+            'image': kb['image']
+        }
 
-                if direction == 'in':
-                    keybinding['transition_in'] = trans_data
-                elif direction == 'out':
-                    keybinding['transition_out'] = trans_data
+        if kb['description']:
+            keybinding['description'] = kb['description']
 
-            keybindings.append(keybinding)
+        for transition_type in ['transition_in', 'transition_out']:
+            if transition_type in kb:
+                keybinding[transition_type] = kb[transition_type]
 
-        conn.close()
+        return keybinding
 
-        config = {
+    def _assemble_config(self, settings, keybindings):
+        return {
             'port': settings.get('port', 5000),
             'shutdown_combo': settings.get('shutdown_combo', ['ctrl', 'shift', 'q']),
             'default_image': settings.get('default_image', ''),
+            'key_event_window_ms': settings.get('key_event_window_ms', 0),
+            'variant_widths': settings.get('variant_widths', []),
+            'atlas_mode': settings.get('atlas_mode', 0),
+            'server_mode': settings.get('server_mode', 'threading'),
+            'websocket_only': settings.get('websocket_only', 0),
+            'transition_retrigger': settings.get('transition_retrigger', 'cancel'),
             'keybindings': keybindings
         }
 
+    def load_config(self):
+        conn = self.get_connection()
+        settings = self._load_settings(conn)
+        keybindings = [self._build_keybinding(kb) for kb in self.fetch_keybindings(conn, enabled_only=True)]
+        conn.close()
+
+        config = self._assemble_config(settings, keybindings)
         config = self._process_config_transitions(config)
 
         return config
 
+    def fetch_keybindings(self, conn, enabled_only=False, ids=None):
+        """Loads keybindings and their transitions with a single JOIN, by priority"""
+        conditions = []
+        params = []
+        if enabled_only:
+            conditions.append('k.enabled = 1')
+        if ids is not None:
+            conditions.append(f"k.id IN ({','.join('?' * len(ids))})")
+            params.extend(ids)
+
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT k.id, k.keys, k.type, k.image, k.description, k.priority, k.enabled,
+                   t.direction, t.image, t.duration
+            FROM keybindings k
+            LEFT JOIN transitions t ON t.keybinding_id = k.id
+            {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
+            ORDER BY k.priority DESC, k.id
+        ''', params)
+
+        keybindings = []
+        last = None
+        for (kb_id, keys, kb_type, image, description, priority, enabled,
+             direction, trans_image, trans_duration) in cursor.fetchall():
+            if last is None or last['id'] != kb_id:
+                last = {
+                    'id': kb_id,
+                    'keys': json.loads(keys),
+                    'type': kb_type,
+                    'image': image,
+                    'description': description or '',
+                    'priority': priority,
+                    'enabled': bool(enabled)
+                }
+                keybindings.append(last)
+
+            if direction in ('in', 'out'):
+                trans_data = {'image': trans_image}
+                if trans_duration is not None:
+                    trans_data['duration'] = trans_duration
+                last[f'transition_{direction}'] = trans_data
+
+        return keybindings
+
+    def _compile_keybinding(self, kb):
+        return freeze(self._process_binding_transitions(self._build_keybinding(kb)))
+
+    def _current_version(self, conn):
+        # Last assigned version, which survives the trimming of applied entries
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'config_changes'").fetchone()
+        return row[0] if row else 0
+
+    def _full_load(self, conn):
+        self.version = self._current_version(conn)
+        self._settings = self._load_settings(conn)
+        self._bindings = {
+            kb['id']: (kb['priority'], self._compile_keybinding(kb))
+            for kb in self.fetch_keybindings(conn, enabled_only=True)
+        }
+
+    def _apply_changes(self, conn):
+        """Applies the config_changes logged since self.version; returns how many entities changed"""
+        version = self._current_version(conn)
+        if version == self.version:
+            return 0
+
+        rows = conn.execute(
+            "SELECT entity, entity_key FROM config_changes WHERE version > ? AND version <= ?",
+            (self.version, version)
+        ).fetchall()
+        setting_keys = {key for entity, key in rows if entity == 'setting'}
+        binding_ids = {int(key) for entity, key in rows if entity == 'keybinding'}
+
+        if len(binding_ids) > _MAX_DELTA_BINDINGS:
+            # e.g. an import, cheaper to read everything again
+            self._full_load(conn)
+            return len(setting_keys) + len(binding_ids)
+
+        if setting_keys:
+            settings = {k: v for k, v in self._settings.items() if k not in setting_keys}
+            settings.update(self._load_settings(conn, setting_keys))
+            self._settings = settings
+
+        if binding_ids:
+            bindings = {i: b for i, b in self._bindings.items() if i not in binding_ids}
+            for kb in self.fetch_keybindings(conn, enabled_only=True, ids=sorted(binding_ids)):
+                bindings[kb['id']] = (kb['priority'], self._compile_keybinding(kb))
+            self._bindings = bindings
+
+        self.version = version
+        # Applied entries are no longer needed (AUTOINCREMENT keeps versions growing)
+        conn.execute("DELETE FROM config_changes WHERE version <= ?", (version,))
+        conn.commit()
+        return len(setting_keys) + len(binding_ids)
+
+    def _publish(self):
+        """Builds a new immutable snapshot and swaps it in with a single assignment"""
+        ordered = sorted(self._bindings.items(), key=lambda item: (-item[1][0], item[0]))
+        config = freeze(self._assemble_config(self._settings, [binding for _, (_, binding) in ordered]))
+        self._snapshot = ConfigSnapshot(self.version, config)
+        return config
+
     def reload(self):
+        """Brings the cached config up to date with the database.
+
+        Only settings and keybindings listed in config_changes since the last
+        reload are read again (GIF durations included); a reload with no
+        changes returns the current config as is. The lock only serializes
+        writers, readers go through get_config()/get_snapshot().
+        """
         with self._lock:
-            self._config_cache = self.load_config()
-            print("[INFO] Configuración recargada desde base de datos")
-            return self._config_cache
+            conn = self.get_connection()
+            try:
+                if self._snapshot is None:
+                    self._full_load(conn)
+                    print("[INFO] Configuración recargada desde base de datos")
+                    return self._publish()
+
+                changed = self._apply_changes(conn)
+            finally:
+                conn.close()
+
+            if not changed:
+                return self._snapshot.config
+
+            print(f"[INFO] Configuración recargada desde base de datos ({changed} cambios)")
+            return self._publish()
+
+    def get_snapshot(self):
+        """Returns the current ConfigSnapshot (version + read-only config), without locking"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    conn = self.get_connection()
+                    try:
+                        self._full_load(conn)
+                    finally:
+                        conn.close()
+                    self._publish()
+                snapshot = self._snapshot
+        return snapshot
 
     def get_config(self):
-        if self._config_cache is None:
-            with self._lock:
-                if self._config_cache is None:
-                    self._config_cache = self.load_config()
-        return self._config_cache
+        return self.get_snapshot().config
 
     def get_connection(self):
-        return sqlite3.connect(self.db_path)
+        """Returns a pooled connection; close() gives it back to the pool"""
+        return self._pool.acquire()
@@ -0,0 +1,76 @@
+import sqlite3
+import threading
+
+
+class PooledConnection(sqlite3.Connection):
+    """sqlite3 connection whose close() hands it back to its pool"""
+
+    pool = None
+
+    def close(self):
+        if self.pool is None:
+            super().close()
+        else:
+            self.pool.release(self)
+
+
+class ConnectionPool:
+    """Small pool of SQLite connections shared by the request threads.
+
+    A connection is used by one thread at a time but can move between threads,
+    since Werkzeug spawns a new thread per request. Every connection runs with
+    foreign keys enabled and synchronous=NORMAL on a WAL database, and keeps its
+    prepared statement cache while it sits idle in the pool.
+    """
+
+    def __init__(self, db_path, max_idle=4, cached_statements=256):
+        self.db_path = db_path
+        self.max_idle = max_idle
+        self.cached_statements = cached_statements
+        self._idle = []
+        self._lock = threading.Lock()
+        self._wal_enabled = False
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.db_path,
+            factory=PooledConnection,
+            check_same_thread=False,
+            cached_statements=self.cached_statements
+        )
+        if not self._wal_enabled:
+            # journal_mode is stored in the database file, once is enough
+            conn.execute("PRAGMA journal_mode = WAL")
+            self._wal_enabled = True
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.pool = self
+        return conn
+
+    def acquire(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._connect()
+
+    def release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = None
+        except sqlite3.Error:
+            sqlite3.Connection.close(conn)
+            return
+
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+
+        sqlite3.Connection.close(conn)
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            sqlite3.Connection.close(conn)
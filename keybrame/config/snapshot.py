@@ -0,0 +1,35 @@
+from dataclasses import dataclass
+
+
+class FrozenDict(dict):
+    """Read-only dict. Still a dict, so it serializes to JSON like the config always did"""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("La configuración publicada es de solo lectura")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __hash__(self):
+        # Consistent with dict equality; values are frozen, so hashable
+        return hash(frozenset(self.items()))
+
+
+def freeze(value):
+    """Deep copy of value with dicts as FrozenDict and lists as tuples"""
+    if isinstance(value, FrozenDict):
+        return value
+    if isinstance(value, dict):
+        return FrozenDict((k, freeze(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """A published config. A new snapshot replaces the previous one on every
+    change, readers keep whichever reference they took and never see a
+    half-applied update."""
+    version: int
+    config: FrozenDict
@@ -0,0 +1,73 @@
+import os
+import queue
+import threading
+from keybrame.core.image import get_image_metadata
+from keybrame.core.assets import get_content_hash
+from keybrame.core import variants
+
+# Uploaded images are analyzed here, off the request thread: metadata (which
+# also fills the image_metadata table), content hash and variants. Listeners
+# get the result of every file, the images API uses it to notify the admin.
+
+_queue = queue.Queue()
+_listeners = []
+_lock = threading.Lock()
+_worker = None
+
+
+def add_listener(callback):
+    """callback(result) is called from the worker thread after each analysis"""
+    _listeners.append(callback)
+
+
+def _start_worker():
+    global _worker
+    with _lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_run_worker, daemon=True)
+            _worker.start()
+
+
+def _run_worker():
+    while True:
+        full_path = _queue.get()
+        try:
+            result = analyze(full_path)
+        except Exception as e:
+            print(f"[WARNING] No se pudo analizar {full_path}: {e}")
+            continue
+
+        for callback in list(_listeners):
+            try:
+                callback(result)
+            except Exception as e:
+                print(f"[WARNING] Error notificando análisis de {full_path}: {e}")
+
+
+def schedule(full_path):
+    """Queues an image for background analysis"""
+    _start_worker()
+    _queue.put(full_path)
+
+
+def pending():
+    return _queue.qsize()
+
+
+def analyze(full_path):
+    metadata = get_image_metadata(full_path)
+    get_content_hash(full_path)
+    variants.schedule(full_path)
+
+    filename = os.path.basename(full_path)
+    ext = os.path.splitext(filename)[1].lower()
+    return {
+        'path': f"assets/{filename}",
+        'filename': filename,
+        'size': os.path.getsize(full_path),
+        'type': ext[1:],
+        'duration': metadata['duration'] if ext == '.gif' else None,
+        'frames': metadata['frames'],
+        'width': metadata['width'],
+        'height': metadata['height']
+    }
@@ -0,0 +1,183 @@
+import mmap
+import struct
+
+# Fast metadata parsers for animated images. They walk the container structure
+# (GIF blocks, RIFF chunks, PNG chunks) and read frame delays from the headers
+# without decompressing any frame data. Every parser raises ValueError on data
+# it does not understand, and parse_animation() then returns None so the caller
+# can fall back to Pillow.
+
+
+def _metadata(duration, frames, width, height, image_format):
+    return {
+        'duration': duration if frames > 1 else 0,
+        'frames': frames,
+        'width': width,
+        'height': height,
+        'format': image_format
+    }
+
+
+def _skip_sub_blocks(data, pos):
+    size = len(data)
+    while True:
+        if pos >= size:
+            raise ValueError("GIF truncado")
+        block_size = data[pos]
+        pos += 1
+        if block_size == 0:
+            return pos
+        pos += block_size
+
+
+def parse_gif(data):
+    if data[:6] not in (b'GIF87a', b'GIF89a') or len(data) < 13:
+        raise ValueError("No es un GIF")
+
+    width, height, packed = struct.unpack_from('<HHB', data, 6)
+    pos = 13
+    if packed & 0x80:
+        pos += 3 * (2 << (packed & 0x07))
+
+    size = len(data)
+    frames = 0
+    duration = 0
+    # Delay of the Graphic Control Extension that applies to the next frame
+    pending_delay = None
+
+    while pos < size:
+        block = data[pos]
+        pos += 1
+
+        if block == 0x3B:
+            break
+        elif block == 0x21:
+            if pos >= size:
+                raise ValueError("GIF truncado")
+            label = data[pos]
+            pos += 1
+            if label == 0xF9 and pos + 5 <= size and data[pos] >= 4:
+                pending_delay = struct.unpack_from('<H', data, pos + 2)[0] * 10
+            pos = _skip_sub_blocks(data, pos)
+        elif block == 0x2C:
+            if pos + 10 > size:
+                raise ValueError("GIF truncado")
+            local_packed = data[pos + 8]
+            pos += 9
+            if local_packed & 0x80:
+                pos += 3 * (2 << (local_packed & 0x07))
+            # LZW minimum code size, then the image data sub-blocks
+            pos = _skip_sub_blocks(data, pos + 1)
+
+            frames += 1
+            duration += pending_delay if pending_delay is not None else 100
+            pending_delay = None
+        else:
+            raise ValueError(f"Bloque GIF desconocido: {block:#x}")
+
+    if frames == 0:
+        raise ValueError("GIF sin frames")
+    return _metadata(duration, frames, width, height, 'GIF')
+
+
+def parse_webp(data):
+    if len(data) < 12 or data[:4] != b'RIFF' or data[8:12] != b'WEBP':
+        raise ValueError("No es un WebP")
+
+    size = min(len(data), 8 + struct.unpack_from('<I', data, 4)[0])
+    pos = 12
+    width = height = None
+    frames = 0
+    duration = 0
+
+    while pos + 8 <= size:
+        chunk_type = data[pos:pos + 4]
+        chunk_size = struct.unpack_from('<I', data, pos + 4)[0]
+        body = pos + 8
+        if body + chunk_size > size:
+            raise ValueError("WebP truncado")
+
+        if chunk_type == b'VP8X' and chunk_size >= 10:
+            width = 1 + int.from_bytes(data[body + 4:body + 7], 'little')
+            height = 1 + int.from_bytes(data[body + 7:body + 10], 'little')
+        elif chunk_type == b'ANMF' and chunk_size >= 16:
+            frames += 1
+            duration += int.from_bytes(data[body + 12:body + 15], 'little')
+        elif chunk_type == b'VP8L' and width is None and chunk_size >= 5:
+            if data[body] != 0x2F:
+                raise ValueError("VP8L inválido")
+            bits = int.from_bytes(data[body + 1:body + 5], 'little')
+            width = 1 + (bits & 0x3FFF)
+            height = 1 + ((bits >> 14) & 0x3FFF)
+            frames = max(frames, 1)
+        elif chunk_type == b'VP8 ' and width is None and chunk_size >= 10:
+            if data[body + 3:body + 6] != b'\x9d\x01\x2a':
+                raise ValueError("VP8 inválido")
+            width = struct.unpack_from('<H', data, body + 6)[0] & 0x3FFF
+            height = struct.unpack_from('<H', data, body + 8)[0] & 0x3FFF
+            frames = max(frames, 1)
+
+        # Chunks are padded to an even size
+        pos = body + chunk_size + (chunk_size & 1)
+
+    if width is None or frames == 0:
+        raise ValueError("WebP sin frames")
+    return _metadata(duration, frames, width, height, 'WEBP')
+
+
+def parse_png(data):
+    if data[:8] != b'\x89PNG\r\n\x1a\n':
+        raise ValueError("No es un PNG")
+
+    size = len(data)
+    pos = 8
+    width = height = None
+    frames = 1
+    durations = []
+
+    while pos + 8 <= size:
+        chunk_size, chunk_type = struct.unpack_from('>I4s', data, pos)
+        body = pos + 8
+        if body + chunk_size + 4 > size:
+            raise ValueError("PNG truncado")
+
+        if chunk_type == b'IHDR':
+            width, height = struct.unpack_from('>II', data, body)
+        elif chunk_type == b'acTL':
+            # A default image without fcTL is not part of the animation
+            frames = struct.unpack_from('>I', data, body)[0]
+        elif chunk_type == b'fcTL':
+            delay_num, delay_den = struct.unpack_from('>HH', data, body + 20)
+            durations.append(float(delay_num) / float(delay_den or 100) * 1000)
+        elif chunk_type == b'IEND':
+            break
+
+        pos = body + chunk_size + 4
+
+    if width is None:
+        raise ValueError("PNG sin IHDR")
+    if frames > 1 and len(durations) != frames:
+        raise ValueError("APNG incompleto")
+    duration = int(sum(durations)) if frames > 1 else 0
+    return _metadata(duration, frames, width, height, 'PNG')
+
+
+_PARSERS = {
+    b'GIF8': parse_gif,
+    b'RIFF': parse_webp,
+    b'\x89PNG': parse_png
+}
+
+
+def parse_animation(full_path):
+    """Returns image metadata parsed from the file headers, or None if unsupported"""
+    try:
+        with open(full_path, 'rb') as f:
+            parser = _PARSERS.get(f.read(4))
+            if parser is None:
+                return None
+            f.seek(0)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return parser(data)
+    except (OSError, ValueError, struct.error, IndexError):
+        return None
@@ -0,0 +1,210 @@
+import os
+import time
+import hashlib
+import mimetypes
+import threading
+from collections import OrderedDict
+from keybrame.core.image import resolve_image_path, get_image_metadata
+
+PLACEHOLDER_IMAGE = 'assets/placeholder.svg'
+
+# assets/<hash>/<name> URLs never change content, clients may cache them for a year
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+# abs path -> ((size, mtime_ns), content hash)
+_hash_cache = {}
+_hash_lock = threading.Lock()
+
+
+def get_content_hash(image_path):
+    """Returns a short sha256 of the file contents, or None if it does not exist.
+
+    Hashes are cached by path + size + mtime, so unchanged files cost a stat call.
+    """
+    full_path = resolve_image_path(image_path)
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        return None
+
+    fingerprint = (stat.st_size, stat.st_mtime_ns)
+    with _hash_lock:
+        cached = _hash_cache.get(full_path)
+        if cached and cached[0] == fingerprint:
+            return cached[1]
+
+    digest = hashlib.sha256()
+    try:
+        with open(full_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+    except OSError:
+        return None
+
+    content_hash = digest.hexdigest()[:16]
+    with _hash_lock:
+        _hash_cache[full_path] = (fingerprint, content_hash)
+    return content_hash
+
+
+class AssetCache:
+    """Byte-budget LRU of image files, so hot assets are served from RAM.
+
+    Entries keep the file bytes together with their content hash and mimetype.
+    An entry is checked against the file size and mtime at most every
+    revalidate_interval seconds, which keeps slow or network-synced image
+    folders off the request path; the images API calls invalidate() right
+    away when it writes or deletes a file. Files bigger than max_file_bytes
+    are never cached and keep being streamed from disk.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_file_bytes=8 * 1024 * 1024,
+                 revalidate_interval=2.0):
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self.revalidate_interval = revalidate_interval
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, full_path):
+        """Returns the cached entry for full_path, or None if it must be read from disk"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(full_path)
+            if entry and now - entry['checked_at'] < self.revalidate_interval:
+                self._entries.move_to_end(full_path)
+                self.hits += 1
+                return entry
+
+        try:
+            stat = os.stat(full_path)
+        except OSError:
+            self.invalidate(full_path)
+            self.misses += 1
+            return None
+
+        fingerprint = (stat.st_size, stat.st_mtime_ns)
+        if entry and entry['fingerprint'] == fingerprint:
+            with self._lock:
+                entry['checked_at'] = now
+                self.hits += 1
+            return entry
+
+        self.misses += 1
+        self.invalidate(full_path)
+        if stat.st_size > self.max_file_bytes:
+            return None
+
+        try:
+            with open(full_path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+
+        content_hash = hashlib.sha256(data).hexdigest()[:16]
+        with _hash_lock:
+            _hash_cache[full_path] = (fingerprint, content_hash)
+
+        entry = {
+            'data': data,
+            'hash': content_hash,
+            'mimetype': mimetypes.guess_type(full_path)[0] or 'application/octet-stream',
+            'fingerprint': fingerprint,
+            'checked_at': now
+        }
+        with self._lock:
+            # Another thread may have read the same file meanwhile
+            previous = self._entries.pop(full_path, None)
+            if previous:
+                self.total_bytes -= len(previous['data'])
+            self._entries[full_path] = entry
+            self.total_bytes += len(data)
+            while self.total_bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self.total_bytes -= len(evicted['data'])
+        return entry
+
+    def invalidate(self, full_path=None):
+        """Drops full_path from the cache, or every entry if no path is given"""
+        with self._lock:
+            if full_path is None:
+                self._entries.clear()
+                self.total_bytes = 0
+                return
+            entry = self._entries.pop(full_path, None)
+            if entry:
+                self.total_bytes -= len(entry['data'])
+
+    def get_stats(self):
+        requests = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self.total_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / requests, 4) if requests else None
+        }
+
+
+asset_cache = AssetCache()
+
+
+def get_asset_url(image_path):
+    """Returns the content-addressed URL (assets/<hash>/<name>) of a config image"""
+    if not image_path or not image_path.startswith('assets/') or image_path == PLACEHOLDER_IMAGE:
+        return image_path
+
+    content_hash = get_content_hash(image_path)
+    if content_hash is None:
+        return image_path
+    return f"assets/{content_hash}/{image_path[len('assets/'):]}"
+
+
+def split_asset_url(filename):
+    """Splits '<hash>/<name>' from an /assets/ URL into (hash, name); hash is None for plain names"""
+    content_hash, sep, name = filename.partition('/')
+    if sep and len(content_hash) == 16 and all(c in '0123456789abcdef' for c in content_hash):
+        return content_hash, name
+    return None, filename
+
+
+def collect_config_images(config):
+    """Returns every image the active config can display, without duplicates"""
+    images = [config.get('default_image') or PLACEHOLDER_IMAGE]
+    for binding in config.get('keybindings', []):
+        images.append(binding['image'])
+        for transition_type in ['transition_in', 'transition_out', 'transition']:
+            if transition_type in binding:
+                images.append(binding[transition_type]['image'])
+    return list(dict.fromkeys(image for image in images if image))
+
+
+def build_asset_manifest(config):
+    assets = []
+    for image_path in collect_config_images(config):
+        if image_path == PLACEHOLDER_IMAGE:
+            assets.append({'path': image_path, 'url': image_path, 'size': None, 'hash': None})
+            continue
+
+        content_hash = get_content_hash(image_path)
+        if content_hash is None:
+            continue
+
+        metadata = get_image_metadata(image_path)
+        assets.append({
+            'path': image_path,
+            'url': get_asset_url(image_path),
+            'size': os.path.getsize(resolve_image_path(image_path)),
+            'hash': content_hash,
+            'width': metadata['width'],
+            'height': metadata['height'],
+            'duration': metadata['duration']
+        })
+
+    return {'assets': assets}
@@ -0,0 +1,138 @@
+import os
+import hashlib
+import threading
+from keybrame.core.assets import collect_config_images, get_asset_url, get_content_hash
+from keybrame.core.image import get_image_metadata, resolve_image_path
+from keybrame.utils import paths
+
+# Only small static images are worth packing; big ones and animations keep
+# being displayed through the regular <img> path.
+MAX_SPRITE_SIZE = 512
+MAX_SHEET_SIZE = 4096
+_PADDING = 2
+
+EMPTY_ATLAS = {'sheets': [], 'sprites': {}}
+
+_lock = threading.Lock()
+_last_key = None
+_last_atlas = None
+
+
+def get_atlas_dir():
+    return os.path.join(paths.get_cache_dir(), 'atlas')
+
+
+def prune(keep=()):
+    """Deletes sheet files other than keep (file names).
+
+    Sheets are named by the hash of their contents, so each rebuilt atlas
+    leaves the previous one behind.
+    """
+    try:
+        names = os.listdir(get_atlas_dir())
+    except OSError:
+        return
+    for name in names:
+        if name not in keep:
+            try:
+                os.remove(os.path.join(get_atlas_dir(), name))
+            except OSError:
+                pass
+
+
+def _atlas_candidates(config):
+    candidates = []
+    for image_path in collect_config_images(config):
+        metadata = get_image_metadata(image_path)
+        if metadata['frames'] != 1 or not metadata['width']:
+            continue
+        if max(metadata['width'], metadata['height']) > MAX_SPRITE_SIZE:
+            continue
+        content_hash = get_content_hash(image_path)
+        if content_hash:
+            candidates.append((image_path, content_hash, metadata['width'], metadata['height']))
+    return candidates
+
+
+def _pack(candidates):
+    """Shelf packing, tallest first. Returns [(sheet, x, y)] in candidates order"""
+    order = sorted(range(len(candidates)), key=lambda i: (-candidates[i][3], -candidates[i][2]))
+    placements = [None] * len(candidates)
+    sheet = x = y = shelf_height = 0
+
+    for idx in order:
+        width = candidates[idx][2] + _PADDING
+        height = candidates[idx][3] + _PADDING
+
+        if x + width > MAX_SHEET_SIZE:
+            x = 0
+            y += shelf_height
+            shelf_height = 0
+        if y + height > MAX_SHEET_SIZE:
+            sheet += 1
+            x = y = shelf_height = 0
+
+        placements[idx] = (sheet, x, y)
+        x += width
+        shelf_height = max(shelf_height, height)
+
+    return placements
+
+
+def build_atlas(config):
+    """Packs the small static images of the config into sprite sheets.
+
+    Returns {'sheets': [{url, width, height}], 'sprites': {asset_url: {sheet, x, y, w, h}}}
+    keyed by the same content-addressed URLs used in image_change payloads.
+    Sheets are cached on disk by the hash of their contents, so an unchanged
+    config reuses them across restarts.
+    """
+    global _last_key, _last_atlas
+
+    candidates = _atlas_candidates(config)
+    key = hashlib.sha256(repr((MAX_SHEET_SIZE, candidates)).encode('utf-8')).hexdigest()[:16]
+
+    with _lock:
+        if key == _last_key:
+            return _last_atlas
+
+        placements = _pack(candidates)
+        sheet_count = max((p[0] for p in placements), default=-1) + 1
+        sheet_sizes = [[0, 0] for _ in range(sheet_count)]
+        for (image_path, content_hash, width, height), (sheet, x, y) in zip(candidates, placements):
+            sheet_sizes[sheet][0] = max(sheet_sizes[sheet][0], x + width)
+            sheet_sizes[sheet][1] = max(sheet_sizes[sheet][1], y + height)
+
+        os.makedirs(get_atlas_dir(), exist_ok=True)
+        sheets = []
+        for sheet, (sheet_width, sheet_height) in enumerate(sheet_sizes):
+            filename = f"{key}_{sheet}.png"
+            target = os.path.join(get_atlas_dir(), filename)
+            if not os.path.exists(target):
+                from PIL import Image
+                canvas = Image.new('RGBA', (sheet_width, sheet_height), (0, 0, 0, 0))
+                for (image_path, _, _, _), (image_sheet, x, y) in zip(candidates, placements):
+                    if image_sheet == sheet:
+                        with Image.open(resolve_image_path(image_path)) as img:
+                            canvas.paste(img.convert('RGBA'), (x, y))
+                canvas.save(target + '.tmp', 'PNG', optimize=True)
+                os.replace(target + '.tmp', target)
+            sheets.append({'url': f"atlas/{filename}", 'width': sheet_width, 'height': sheet_height})
+
+        sprites = {}
+        for (image_path, _, width, height), (sheet, x, y) in zip(candidates, placements):
+            sprites[get_asset_url(image_path)] = {'sheet': sheet, 'x': x, 'y': y, 'w': width, 'h': height}
+
+        prune({f"{key}_{sheet}.png" for sheet in range(sheet_count)})
+
+        _last_key = key
+        _last_atlas = {'sheets': sheets, 'sprites': sprites}
+        print(f"[INFO] Atlas generado: {len(sprites)} imágenes en {len(sheets)} hoja(s)")
+        return _last_atlas
+
+
+def get_config_atlas(config):
+    """Atlas for overlays: empty unless the 'atlas_mode' setting is enabled"""
+    if not config.get('atlas_mode'):
+        return EMPTY_ATLAS
+    return build_atlas(config)
@@ -0,0 +1,76 @@
+from keybrame.core.keymask import key_bit, keys_mask
+
+
+class BindingTable:
+    """Compiled view of config['keybindings'], rebuilt on every config reload.
+
+    Each binding is stored as a precomputed key mask (see keymask) and bindings
+    are grouped and indexed by key name, so a keystroke only inspects the
+    bindings that can actually match it and every check is an integer
+    AND/compare. Every group keeps the priority order of the config.
+    """
+
+    def __init__(self, config):
+        self.toggle_by_mask = {}
+        self.single_by_key = {}
+        self.combos_by_key = {}
+        self.combos = []
+        self.holds = []
+        self.hold_mask = 0
+
+        for binding in config.get('keybindings', []):
+            keys = set(k.lower() for k in binding['keys'])
+            mask = keys_mask(keys)
+            binding_type = binding.get('type')
+
+            entry = (mask, binding)
+
+            if binding_type == 'toggle':
+                self.toggle_by_mask.setdefault(mask, entry)
+            elif binding_type == 'hold':
+                self.holds.append(entry)
+                self.hold_mask |= mask
+
+            if len(binding['keys']) > 1:
+                self.combos.append(entry)
+                for key in keys:
+                    self.combos_by_key.setdefault(key, []).append(entry)
+            else:
+                self.single_by_key.setdefault(binding['keys'][0].lower(), entry)
+
+        shutdown_combo = config.get('shutdown_combo')
+        self.shutdown_mask = keys_mask(shutdown_combo) if shutdown_combo else 0
+
+    def match_press(self, key_name, pressed_mask, active_mask):
+        """Returns the (mask, binding) entry triggered by pressing key_name, or None"""
+        if active_mask and pressed_mask == active_mask:
+            entry = self.toggle_by_mask.get(active_mask)
+            if entry:
+                return entry
+
+        for entry in self.combos_by_key.get(key_name, ()):
+            if entry[0] & pressed_mask == entry[0]:
+                return entry
+
+        if active_mask & key_bit(key_name):
+            return None
+        return self.single_by_key.get(key_name)
+
+    def combo_image(self, pressed_mask):
+        for mask, binding in self.combos:
+            if mask & pressed_mask == mask:
+                return binding['image']
+        return None
+
+    def hold_image(self, pressed_mask):
+        for mask, binding in self.holds:
+            if mask & pressed_mask == mask:
+                return binding['image']
+        return None
+
+    def toggle_image(self, active_mask):
+        entry = self.toggle_by_mask.get(active_mask) if active_mask else None
+        return entry[1]['image'] if entry else None
+
+    def is_shutdown(self, pressed_mask):
+        return self.shutdown_mask != 0 and self.shutdown_mask & pressed_mask == self.shutdown_mask
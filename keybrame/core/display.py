@@ -0,0 +1,72 @@
+import math
+import time
+import threading
+from keybrame.core.assets import PLACEHOLDER_IMAGE
+
+# Length of a transition with no known duration
+DEFAULT_TRANSITION_MS = 2000
+
+
+class DisplayState:
+    """What the overlay is showing, as last sent by the server.
+
+    Every update sent to the overlay room takes the next sequence number
+    (seq), so a client that sees a jump knows it missed something and asks
+    for a snapshot. Images are stored as config paths and turned into URLs
+    when the snapshot is taken, so snapshots always carry current hashes.
+    """
+
+    def __init__(self, image):
+        self.seq = 0
+        self.image = image
+        self.transition = None
+        self._lock = threading.Lock()
+
+    def set_image(self, image):
+        with self._lock:
+            self.seq += 1
+            self.image = image
+            self.transition = None
+            return self.seq
+
+    def start_transition(self, transition_image, duration, final_image):
+        with self._lock:
+            self.seq += 1
+            self.image = final_image
+            self.transition = {
+                'image': transition_image,
+                'duration': duration,
+                'started': time.monotonic()
+            }
+            return self.seq
+
+    def set_final_image(self, image):
+        """Changes what the running transition ends on; clients learn it from transition_end"""
+        with self._lock:
+            self.image = image
+
+    def end_transition(self):
+        with self._lock:
+            self.seq += 1
+            self.transition = None
+            return self.seq
+
+    def snapshot(self, asset_url):
+        """Current state for a (re)connecting client; asset_url maps config paths to URLs"""
+        with self._lock:
+            state = {
+                'seq': self.seq,
+                'image': asset_url(self.image or PLACEHOLDER_IMAGE),
+                'transition': None
+            }
+            if self.transition:
+                duration = self.transition['duration'] or DEFAULT_TRANSITION_MS
+                elapsed = (time.monotonic() - self.transition['started']) * 1000
+                if elapsed < duration:
+                    state['transition'] = {
+                        'transition_image': asset_url(self.transition['image']),
+                        'duration': duration,
+                        'remaining': math.ceil(duration - elapsed),
+                        'final_image': state['image']
+                    }
+            return state
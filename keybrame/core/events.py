@@ -0,0 +1,55 @@
+import queue
+
+# Socket.IO rooms clients subscribe to. Every client starts in OVERLAY_ROOM;
+# the raw key stream is only sent to clients that ask for KEYS_ROOM.
+OVERLAY_ROOM = 'overlay'
+KEYS_ROOM = 'keys'
+CHANNELS = (OVERLAY_ROOM, KEYS_ROOM)
+
+
+class EventQueue:
+    """Bounded hand-off queue between the pynput hook threads and the dispatcher.
+
+    put() never blocks: when the queue is full the event is dropped and counted,
+    so a slow consumer can never stall the OS input hook. Events put with
+    force=True (key releases) are always queued, otherwise a dropped release
+    would leave a key stuck as pressed.
+    """
+
+    def __init__(self, maxsize=1024):
+        self._queue = queue.SimpleQueue()
+        self.maxsize = maxsize
+        self.enqueued = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    def put(self, event, force=False):
+        depth = self._queue.qsize()
+        if depth >= self.maxsize and not force:
+            self.dropped += 1
+            return False
+
+        self._queue.put(event)
+        self.enqueued += 1
+        if depth >= self.max_depth:
+            self.max_depth = depth + 1
+        return True
+
+    def get(self, timeout=None):
+        """Returns the next event, or None if timeout expires first"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def get_stats(self):
+        return {
+            'depth': self.depth(),
+            'max_depth': self.max_depth,
+            'maxsize': self.maxsize,
+            'enqueued': self.enqueued,
+            'dropped': self.dropped
+        }
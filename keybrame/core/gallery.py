@@ -0,0 +1,162 @@
+import os
+import time
+import threading
+from keybrame.core.image import get_image_metadata
+from keybrame.utils import paths
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.gif', '.webp', '.bmp'}
+
+
+class ImageIndex:
+    """In-memory listing of the images folder for the admin gallery.
+
+    The folder is scanned once and then only again when its mtime changes
+    (files added, removed or renamed); files whose size and mtime did not
+    change keep their entry, so GIF durations are computed once per file.
+    The images API also updates entries directly on upload and delete, and
+    when the folder watcher runs its changes are applied through
+    apply_changes() and the mtime check is skipped.
+    last_modified is a whole-second timestamp that grows on every change,
+    for If-Modified-Since.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._sorted = None
+        self._dir_mtime = None
+        self._scanned = False
+        self.watched = False
+        self._lock = threading.RLock()
+        self.last_modified = 0
+
+    def _touch(self):
+        self._sorted = None
+        self.last_modified = max(int(time.time()), self.last_modified + 1)
+
+    def _make_entry(self, filename, size, mtime_ns, duration=None, analyze=True):
+        ext = os.path.splitext(filename)[1].lower()
+        if analyze and ext == '.gif':
+            duration = get_image_metadata(os.path.join(paths.get_images_dir(), filename))['duration']
+        return {
+            'path': f"assets/{filename}",
+            'filename': filename,
+            'size': size,
+            'type': ext[1:],
+            'duration': duration,
+            'mtime_ns': mtime_ns
+        }
+
+    def refresh(self):
+        """Rescans the folder if its mtime changed since the last scan"""
+        if self.watched and self._scanned:
+            return
+
+        images_dir = paths.get_images_dir()
+        try:
+            dir_mtime = os.stat(images_dir).st_mtime_ns
+        except OSError:
+            dir_mtime = None
+
+        with self._lock:
+            if dir_mtime == self._dir_mtime and dir_mtime is not None:
+                return
+
+            found = {}
+            if dir_mtime is not None:
+                with os.scandir(images_dir) as it:
+                    for entry in it:
+                        if os.path.splitext(entry.name)[1].lower() not in IMAGE_EXTENSIONS:
+                            continue
+                        try:
+                            if not entry.is_file():
+                                continue
+                            stat = entry.stat()
+                        except OSError:
+                            continue
+                        found[entry.name] = (stat.st_size, stat.st_mtime_ns)
+
+            changed = set(self._entries) - set(found)
+            for filename in changed:
+                del self._entries[filename]
+
+            for filename, (size, mtime_ns) in found.items():
+                current = self._entries.get(filename)
+                if current and current['size'] == size and current['mtime_ns'] == mtime_ns:
+                    continue
+                self._entries[filename] = self._make_entry(filename, size, mtime_ns)
+                changed.add(filename)
+
+            self._dir_mtime = dir_mtime
+            self._scanned = True
+            if changed:
+                self._touch()
+
+    def apply_changes(self, changed, removed):
+        """Watcher listener: changed and removed are sets of file names"""
+        images_dir = paths.get_images_dir()
+        with self._lock:
+            modified = False
+            for filename in removed:
+                modified |= self._entries.pop(filename, None) is not None
+            for filename in changed:
+                if os.path.splitext(filename)[1].lower() not in IMAGE_EXTENSIONS:
+                    continue
+                try:
+                    stat = os.stat(os.path.join(images_dir, filename))
+                except OSError:
+                    modified |= self._entries.pop(filename, None) is not None
+                    continue
+                current = self._entries.get(filename)
+                if current and current['size'] == stat.st_size and current['mtime_ns'] == stat.st_mtime_ns:
+                    continue
+                self._entries[filename] = self._make_entry(filename, stat.st_size, stat.st_mtime_ns)
+                modified = True
+            if modified:
+                self._touch()
+
+    def sync(self, filenames):
+        """Initial load from the watcher's listing, later kept up by apply_changes()"""
+        with self._lock:
+            self.apply_changes(set(filenames), set(self._entries) - set(filenames))
+            self._scanned = True
+
+    def add(self, full_path, duration=None):
+        """Adds or replaces a file right after it is written; duration may come later via update()"""
+        stat = os.stat(full_path)
+        filename = os.path.basename(full_path)
+        with self._lock:
+            self._entries[filename] = self._make_entry(
+                filename, stat.st_size, stat.st_mtime_ns, duration, analyze=False
+            )
+            self._touch()
+
+    def update(self, filename, **fields):
+        with self._lock:
+            entry = self._entries.get(filename)
+            if entry is None:
+                return
+            entry.update(fields)
+            self._touch()
+
+    def remove(self, filename):
+        with self._lock:
+            if self._entries.pop(filename, None) is not None:
+                self._touch()
+
+    def list(self, types=None, offset=0, limit=None):
+        """Returns (total, page) of entries sorted by filename, optionally filtered by type"""
+        self.refresh()
+        with self._lock:
+            if self._sorted is None:
+                self._sorted = sorted(self._entries.values(), key=lambda x: x['filename'].lower())
+            images = self._sorted
+
+        if types:
+            images = [img for img in images if img['type'] in types]
+
+        end = None if limit is None else offset + limit
+        page = [{k: v for k, v in img.items() if k != 'mtime_ns'} for img in images[offset:end]]
+        return len(images), page
+
+
+image_index = ImageIndex()
@@ -1,19 +1,151 @@
-from PIL import Image
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from keybrame.core.animation import parse_animation
+from keybrame.utils import paths
 
+_MEMORY_CACHE_SIZE = 512
+# How long a metadata cache write waits for the database write lock
+_STORE_BUSY_TIMEOUT_MS = 50
+
+# abs path -> (size, mtime_ns, metadata), most recently used last
+_memory_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_connection_factory = None
+
+
+def init_metadata_cache(connection_factory):
+    """Enables the persistent image_metadata table (see ConfigManager)"""
+    global _connection_factory
+    _connection_factory = connection_factory
+
+
+def resolve_image_path(image_path):
+    """Maps config paths like 'assets/foo.gif' to the file in the images folder"""
+    if os.path.isabs(image_path):
+        return image_path
+    for prefix in ('assets/', 'img/', 'images/'):
+        if image_path.startswith(prefix):
+            return os.path.join(paths.get_images_dir(), image_path[len(prefix):])
+    return os.path.abspath(image_path)
 
-def calculate_gif_duration(image_path):
-    """Returns total GIF duration in milliseconds"""
-    try:
-        with Image.open(image_path) as img:
-            if not hasattr(img, 'n_frames') or img.n_frames <= 1:
-                return 0
 
-            total_duration = 0
-            for frame in range(img.n_frames):
-                img.seek(frame)
-                frame_duration = img.info.get('duration', 100)
-                total_duration += frame_duration
+def _read_metadata(full_path):
+    metadata = parse_animation(full_path)
+    if metadata is not None:
+        return metadata
 
-            return total_duration
+    # Other formats, or files the header parsers could not make sense of.
+    # Pillow is imported only here, it is not needed to start the server
+    from PIL import Image
+
+    metadata = {'duration': 0, 'frames': 0, 'width': None, 'height': None, 'format': None}
+    try:
+        with Image.open(full_path) as img:
+            metadata['width'], metadata['height'] = img.size
+            metadata['format'] = img.format
+            metadata['frames'] = getattr(img, 'n_frames', 1)
+
+            if metadata['frames'] > 1:
+                total_duration = 0
+                for frame in range(img.n_frames):
+                    img.seek(frame)
+                    total_duration += img.info.get('duration', 100)
+                metadata['duration'] = total_duration
     except:
-        return 0
+        pass
+    return metadata
+
+
+def _load_stored_metadata(full_path, size, mtime_ns):
+    if not _connection_factory:
+        return None
+    try:
+        conn = _connection_factory()
+        try:
+            row = conn.execute('''
+                SELECT duration, frames, width, height, format
+                FROM image_metadata
+                WHERE path = ? AND size = ? AND mtime_ns = ?
+            ''', (full_path, size, mtime_ns)).fetchone()
+        finally:
+            conn.close()
+    except Exception:
+        return None
+
+    if not row:
+        return None
+    return dict(zip(('duration', 'frames', 'width', 'height', 'format'), row))
+
+
+def _store_metadata(full_path, size, mtime_ns, metadata):
+    """Best-effort write to the persistent cache.
+
+    A cache entry is not worth waiting for: if another connection holds the
+    write lock the entry is skipped (it stays in the memory cache and is
+    stored on a later miss) instead of blocking for the busy timeout.
+    """
+    if not _connection_factory:
+        return
+    try:
+        conn = _connection_factory()
+        try:
+            busy_timeout = conn.execute("PRAGMA busy_timeout").fetchone()[0]
+            conn.execute(f"PRAGMA busy_timeout = {_STORE_BUSY_TIMEOUT_MS}")
+            try:
+                conn.execute('''
+                    INSERT OR REPLACE INTO image_metadata
+                    (path, size, mtime_ns, duration, frames, width, height, format)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (full_path, size, mtime_ns, metadata['duration'], metadata['frames'],
+                      metadata['width'], metadata['height'], metadata['format']))
+                conn.commit()
+            finally:
+                conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout)}")
+        finally:
+            conn.close()
+    except sqlite3.OperationalError as e:
+        if 'locked' not in str(e) and 'busy' not in str(e):
+            print(f"[WARNING] No se pudo guardar metadata de {full_path}: {e}")
+    except Exception as e:
+        print(f"[WARNING] No se pudo guardar metadata de {full_path}: {e}")
+
+
+def get_image_metadata(image_path):
+    """Returns duration (ms), frames, width, height and format of an image.
+
+    Results are cached in memory and in the image_metadata table, keyed by
+    path + size + mtime, so a file is only decoded again after it changes.
+    """
+    full_path = resolve_image_path(image_path)
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        return {'duration': 0, 'frames': 0, 'width': None, 'height': None, 'format': None}
+
+    fingerprint = (stat.st_size, stat.st_mtime_ns)
+
+    with _cache_lock:
+        cached = _memory_cache.get(full_path)
+        if cached and cached[0] == fingerprint:
+            _memory_cache.move_to_end(full_path)
+            return dict(cached[1])
+
+    metadata = _load_stored_metadata(full_path, *fingerprint)
+    if metadata is None:
+        metadata = _read_metadata(full_path)
+        _store_metadata(full_path, *fingerprint, metadata)
+
+    with _cache_lock:
+        _memory_cache[full_path] = (fingerprint, metadata)
+        _memory_cache.move_to_end(full_path)
+        while len(_memory_cache) > _MEMORY_CACHE_SIZE:
+            _memory_cache.popitem(last=False)
+
+    return dict(metadata)
+
+
+def calculate_gif_duration(image_path):
+    """Returns total GIF duration in milliseconds"""
+    return get_image_metadata(image_path)['duration']
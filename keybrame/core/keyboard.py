@@ -1,6 +1,17 @@
 import sys
 import os
+import threading
+import time
 from pynput import keyboard, mouse
+from keybrame.core.assets import get_asset_url
+from keybrame.core.bindings import BindingTable
+from keybrame.core.display import DisplayState, DEFAULT_TRANSITION_MS
+from keybrame.core.events import EventQueue, OVERLAY_ROOM, KEYS_ROOM
+from keybrame.core.keymask import key_bit, keys_mask, mask_keys
+from keybrame.core.scheduler import scheduler
+
+UNKNOWN_KEYS = ['?', '<unknown>', 'unknown']
+UNKNOWN_MASK = keys_mask(UNKNOWN_KEYS)
 
 
 class KeyboardMouseHandler:
@@ -8,24 +19,174 @@ class KeyboardMouseHandler:
     def __init__(self, config_manager, socketio):
         self.config_manager = config_manager
         self.socketio = socketio
-        self.config = config_manager.get_config()
-
-        self.pressed_keys = set()
-        self.physically_pressed_keys = set()
-        self.active_press_key = None
+        # Immutable ConfigSnapshot, replaced (never modified) by apply_reload()
+        self.snapshot = config_manager.get_snapshot()
+        self.config = self.snapshot.config
+        self.bindings = BindingTable(self.config)
+
+        # Key state as bitmasks, see keybrame.core.keymask
+        self.pressed_mask = 0
+        self.physical_mask = 0
+        self.active_mask = 0
+
+        # pynput callbacks only enqueue; matching and emits run on the dispatcher
+        self.events = EventQueue()
+        self.processed = 0
+        self.dispatcher_thread = None
+
+        # Last image_change sent per room, used to skip no-ops
+        self.last_images = {}
+        # Sequence-numbered overlay state, sent whole to connecting clients
+        self.display = DisplayState(self.get_base_image())
+        # Transition in progress: its scheduler timer, and with the 'chain'
+        # retrigger policy the transition queued to start when it ends
+        self.transition_timer = None
+        self.chained_transition = None
+        # Config image path -> content-addressed URL, cleared on reload
+        self.asset_urls = {}
+        # sids subscribed to KEYS_ROOM; replaced by the set app.py maintains
+        self.key_subscribers = set()
+        self.key_event_window = self.config.get('key_event_window_ms', 0) / 1000
+        self.pending_key_events = []
+        self.key_events_deadline = 0
 
         self.keyboard_listener = None
         self.mouse_listener = None
 
     def reload_config(self):
-        self.config = self.config_manager.get_config()
-        self.pressed_keys.clear()
-        self.physically_pressed_keys.clear()
-        self.active_press_key = None
+        if self.dispatcher_thread:
+            self.events.put(('reload', None), force=True)
+        else:
+            self.apply_reload()
+
+    def apply_reload(self):
+        snapshot = self.config_manager.get_snapshot()
+        if snapshot is self.snapshot:
+            return
+
+        self.snapshot = snapshot
+        self.config = snapshot.config
+        self.bindings = BindingTable(self.config)
+        self.key_event_window = self.config.get('key_event_window_ms', 0) / 1000
+        self.asset_urls = {}
+        self.flush_key_events()
+
+        # Keys held right now stay held; an active toggle survives as long as
+        # a toggle with the same keys still exists
+        if self.active_mask and self.active_mask not in self.bindings.toggle_by_mask:
+            self.active_mask = 0
+
+        # Only reaches the overlay if the displayed image actually changed
+        self.emit_image(self.determine_current_image())
+        print("[INFO] Configuración del handler actualizada")
+
+    def asset_url(self, image):
+        url = self.asset_urls.get(image)
+        if url is None:
+            url = get_asset_url(image)
+            self.asset_urls[image] = url
+        return url
+
+    def chain_transitions(self):
+        return self.transition_timer is not None and self.config.get('transition_retrigger') == 'chain'
+
+    def cancel_transition(self):
+        if self.transition_timer is not None:
+            scheduler.cancel(self.transition_timer)
+            self.transition_timer = None
+        self.chained_transition = None
+
+    def emit_image(self, image, room=OVERLAY_ROOM):
+        if self.last_images.get(room) == image:
+            return
+        self.last_images[room] = image
+
+        if self.chain_transitions():
+            # Shown when the running transition (and any chained one) ends
+            if self.chained_transition:
+                self.chained_transition = (self.chained_transition[0], image)
+            else:
+                self.display.set_final_image(image)
+            return
+
+        self.cancel_transition()
+        seq = self.display.set_image(image)
+        self.socketio.emit('image_change', {'image': self.asset_url(image), 'seq': seq}, to=room)
+
+    def emit_transition(self, transition_data, final_image, room=OVERLAY_ROOM):
+        self.last_images[room] = final_image
+
+        if self.chain_transitions():
+            self.chained_transition = (transition_data, final_image)
+            return
+
+        self.cancel_transition()
+        duration = transition_data.get('duration')
+        seq = self.display.start_transition(transition_data['image'], duration, final_image)
+        self.transition_timer = scheduler.call_later(
+            (duration or DEFAULT_TRANSITION_MS) / 1000, self.on_transition_timer, seq
+        )
+        self.socketio.emit('transition', {
+            'transition_image': self.asset_url(transition_data['image']),
+            'duration': duration,
+            'final_image': self.asset_url(final_image),
+            'seq': seq
+        }, to=room)
+
+    def on_transition_timer(self, seq):
+        # Scheduler thread: the end is handled on the dispatcher like any input
+        if self.dispatcher_thread:
+            self.events.put(('transition_end', seq), force=True)
+        else:
+            self.end_transition(seq)
+
+    def end_transition(self, seq):
+        """Shows the final image once the transition started with seq has run its course"""
+        if self.transition_timer is None or self.display.transition is None or self.display.seq != seq:
+            return
+        self.transition_timer = None
+
+        if self.chained_transition:
+            transition_data, final_image = self.chained_transition
+            self.chained_transition = None
+            self.emit_transition(transition_data, final_image)
+            return
+
+        seq = self.display.end_transition()
+        self.socketio.emit('transition_end', {'image': self.asset_url(self.display.image), 'seq': seq}, to=OVERLAY_ROOM)
+
+    def get_display_state(self):
+        state = self.display.snapshot(self.asset_url)
+        state['active'] = mask_keys(self.active_mask)
+        state['held'] = mask_keys(self.pressed_mask)
+        return state
 
-        default_image = self.config.get('default_image', '') or 'assets/placeholder.svg'
-        self.socketio.emit('image_change', {'image': default_image})
-        print("[INFO] Configuración del handler actualizada y estado reseteado")
+    def reset_asset_urls(self):
+        """Called when image files change on disk, so new URLs carry the new hashes"""
+        self.asset_urls = {}
+
+    def emit_key_event(self, event, key_name):
+        if not self.key_subscribers:
+            return
+
+        if not self.key_event_window:
+            self.socketio.emit(event, {'key': key_name}, to=KEYS_ROOM)
+            return
+
+        if not self.pending_key_events:
+            self.key_events_deadline = time.monotonic() + self.key_event_window
+        self.pending_key_events.append([event, key_name])
+
+    def flush_key_events(self):
+        if not self.pending_key_events:
+            return
+        events, self.pending_key_events = self.pending_key_events, []
+        # Called from the dispatcher loop outside its per-event guard: an emit
+        # error must not stop input handling
+        try:
+            self.socketio.emit('key_events', {'events': events}, to=KEYS_ROOM)
+        except Exception as e:
+            print(f"[WARNING] Error enviando eventos de teclas: {e}")
 
     def normalize_key(self, key):
         try:
@@ -56,28 +217,15 @@ class KeyboardMouseHandler:
             return None
 
     def check_combos(self):
-        for binding in self.config['keybindings']:
-            if len(binding['keys']) > 1:
-                required_keys = set(k.lower() for k in binding['keys'])
-                if required_keys.issubset(self.pressed_keys):
-                    return binding['image']
-        return None
+        return self.bindings.combo_image(self.pressed_mask)
 
     def check_hold_keys(self):
-        for binding in self.config['keybindings']:
-            if binding.get('type') == 'hold':
-                required_keys = set(k.lower() for k in binding['keys'])
-                if required_keys.issubset(self.pressed_keys):
-                    return binding['image']
-        return None
+        return self.bindings.hold_image(self.pressed_mask)
 
     def get_base_image(self):
-        if self.active_press_key:
-            for binding in self.config['keybindings']:
-                if binding.get('type') == 'toggle':
-                    binding_keys = frozenset(k.lower() for k in binding['keys'])
-                    if binding_keys == self.active_press_key:
-                        return binding['image']
+        toggle_image = self.bindings.toggle_image(self.active_mask)
+        if toggle_image:
+            return toggle_image
         default = self.config.get('default_image', '')
         return default if default else 'assets/placeholder.svg'
 
@@ -93,6 +241,12 @@ class KeyboardMouseHandler:
         return self.get_base_image()
 
     def on_press(self, key):
+        self.events.put(('press', key))
+
+    def on_release(self, key):
+        self.events.put(('release', key), force=True)
+
+    def handle_press(self, key):
         if isinstance(key, str):
             key_name = key
         else:
@@ -100,124 +254,83 @@ class KeyboardMouseHandler:
             if not key_name:
                 return
 
-        if key_name in self.physically_pressed_keys:
+        bit = key_bit(key_name)
+        if self.physical_mask & bit:
             return
 
-        self.physically_pressed_keys.add(key_name)
-        self.pressed_keys.add(key_name)
-
-        self.socketio.emit('key_pressed', {'key': key_name})
-
-        shutdown_combo = self.config.get('shutdown_combo')
-        if shutdown_combo:
-            shutdown_keys = set(k.lower() for k in shutdown_combo)
-            if shutdown_keys.issubset(self.pressed_keys):
-                print("\n" + "="*60)
-                print(f"  Shutdown combo detectado ({'+'.join(shutdown_combo)}) - Cerrando servidor...")
-                print("="*60)
-                sys.stdout.flush()
-                try:
-                    self.socketio.stop()
-                except:
-                    pass
-                os._exit(0)
-
-        matched_binding = None
-
-        if self.active_press_key:
-            if frozenset(self.pressed_keys) == self.active_press_key:
-                for binding in self.config['keybindings']:
-                    binding_keys = frozenset(k.lower() for k in binding['keys'])
-                    if binding_keys == self.active_press_key and binding.get('type') == 'toggle':
-                        matched_binding = binding
-                        break
-
-        if not matched_binding:
-            for binding in self.config['keybindings']:
-                if len(binding['keys']) > 1:
-                    required_keys = set(k.lower() for k in binding['keys'])
-                    if required_keys.issubset(self.pressed_keys):
-                        matched_binding = binding
-                        break
-
-            if not matched_binding:
-                for binding in self.config['keybindings']:
-                    if len(binding['keys']) == 1 and binding['keys'][0].lower() == key_name:
-                        if self.active_press_key and key_name in self.active_press_key:
-                            continue
-                        matched_binding = binding
-                        break
-
-        if matched_binding:
-            binding_keys = frozenset(k.lower() for k in matched_binding['keys'])
+        self.physical_mask |= bit
+        self.pressed_mask |= bit
+
+        self.emit_key_event('key_pressed', key_name)
+
+        if self.bindings.is_shutdown(self.pressed_mask):
+            shutdown_combo = self.config.get('shutdown_combo')
+            print("\n" + "="*60)
+            print(f"  Shutdown combo detectado ({'+'.join(shutdown_combo)}) - Cerrando servidor...")
+            print("="*60)
+            sys.stdout.flush()
+            try:
+                self.socketio.stop()
+            except:
+                pass
+            os._exit(0)
+
+        matched = self.bindings.match_press(key_name, self.pressed_mask, self.active_mask)
+
+        if matched:
+            binding_mask, matched_binding = matched
             binding_type = matched_binding.get('type', 'toggle')
 
             if binding_type == 'toggle':
-                is_active = (self.active_press_key == binding_keys)
+                is_active = (self.active_mask == binding_mask)
 
                 if is_active:
-                    self.active_press_key = None
-                    default_image = self.config.get('default_image', '')
+                    self.active_mask = 0
+                    # Placeholder when no default image is set, so there is
+                    # always something to end the transition on
+                    base_image = self.get_base_image()
 
                     if 'transition_out' in matched_binding:
-                        transition_data = matched_binding['transition_out']
-                        self.socketio.emit('transition', {
-                            'transition_image': transition_data['image'],
-                            'duration': transition_data.get('duration'),
-                            'final_image': default_image
-                        })
+                        self.emit_transition(matched_binding['transition_out'], base_image)
                     else:
-                        self.socketio.emit('image_change', {'image': default_image})
+                        self.emit_image(base_image)
                 else:
-                    self.active_press_key = binding_keys
+                    self.active_mask = binding_mask
 
                     transition_data = matched_binding.get('transition_in') or matched_binding.get('transition')
                     if transition_data:
-                        self.socketio.emit('transition', {
-                            'transition_image': transition_data['image'],
-                            'duration': transition_data.get('duration'),
-                            'final_image': matched_binding['image']
-                        })
+                        self.emit_transition(transition_data, matched_binding['image'])
                     else:
-                        self.socketio.emit('image_change', {'image': matched_binding['image']})
+                        self.emit_image(matched_binding['image'])
 
             elif binding_type == 'hold':
-                current_image = self.determine_current_image()
-                self.socketio.emit('image_change', {'image': current_image})
+                self.emit_image(self.determine_current_image())
 
-    def on_release(self, key):
+    def handle_release(self, key):
         if isinstance(key, str):
             key_name = key
         else:
             key_name = self.normalize_key(key)
             if not key_name:
-                unknown_keys = [k for k in self.pressed_keys if k in ['?', '<unknown>', 'unknown']]
-                for unknown_key in unknown_keys:
-                    self.pressed_keys.discard(unknown_key)
-                    self.physically_pressed_keys.discard(unknown_key)
-                    self.socketio.emit('key_released', {'key': unknown_key})
+                if self.pressed_mask & UNKNOWN_MASK:
+                    for unknown_key in UNKNOWN_KEYS:
+                        bit = key_bit(unknown_key)
+                        if self.pressed_mask & bit:
+                            self.pressed_mask &= ~bit
+                            self.physical_mask &= ~bit
+                            self.emit_key_event('key_released', unknown_key)
                 return
 
-        self.physically_pressed_keys.discard(key_name)
+        bit = key_bit(key_name)
+        self.physical_mask &= ~bit
 
-        is_toggle_key = any(
-            binding.get('type') == 'toggle' and key_name in [k.lower() for k in binding['keys']]
-            for binding in self.config['keybindings']
-        )
+        is_hold_key = self.bindings.hold_mask & bit
 
-        is_hold_key = any(
-            binding.get('type') == 'hold' and key_name in [k.lower() for k in binding['keys']]
-            for binding in self.config['keybindings']
-        )
-
-        self.socketio.emit('key_released', {'key': key_name})
+        self.emit_key_event('key_released', key_name)
 
+        self.pressed_mask &= ~bit
         if is_hold_key:
-            self.pressed_keys.discard(key_name)
-            current_image = self.determine_current_image()
-            self.socketio.emit('image_change', {'image': current_image})
-        else:
-            self.pressed_keys.discard(key_name)
+            self.emit_image(self.determine_current_image())
 
     def on_click(self, x, y, button, pressed):
         button_name = None
@@ -245,7 +358,53 @@ class KeyboardMouseHandler:
         self.on_press(scroll_name)
         self.on_release(scroll_name)
 
+    def dispatch_events(self):
+        while True:
+            timeout = None
+            if self.pending_key_events:
+                timeout = max(0, self.key_events_deadline - time.monotonic())
+
+            event = self.events.get(timeout)
+            if event is None:
+                self.flush_key_events()
+                continue
+
+            kind, key = event
+            if kind == 'stop':
+                self.flush_key_events()
+                break
+
+            try:
+                # Newer config published by another thread: a reference
+                # comparison, no locking on the input path
+                if self.config_manager.get_snapshot() is not self.snapshot:
+                    self.apply_reload()
+
+                if kind == 'press':
+                    self.handle_press(key)
+                elif kind == 'release':
+                    self.handle_release(key)
+                elif kind == 'reload':
+                    self.apply_reload()
+                elif kind == 'transition_end':
+                    self.end_transition(key)
+            except Exception as e:
+                print(f"[WARNING] Error procesando evento de entrada: {e}")
+
+            self.processed += 1
+
+            if self.pending_key_events and time.monotonic() >= self.key_events_deadline:
+                self.flush_key_events()
+
+    def get_stats(self):
+        stats = self.events.get_stats()
+        stats['processed'] = self.processed
+        return stats
+
     def start(self):
+        self.dispatcher_thread = threading.Thread(target=self.dispatch_events, daemon=True)
+        self.dispatcher_thread.start()
+
         self.keyboard_listener = keyboard.Listener(
             on_press=self.on_press,
             on_release=self.on_release
@@ -265,3 +424,7 @@ class KeyboardMouseHandler:
             self.keyboard_listener.stop()
         if self.mouse_listener:
             self.mouse_listener.stop()
+        if self.dispatcher_thread:
+            self.events.put(('stop', None), force=True)
+            self.dispatcher_thread.join(timeout=1)
+            self.dispatcher_thread = None
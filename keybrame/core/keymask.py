@@ -0,0 +1,49 @@
+import threading
+
+VALID_KEYS = [
+    *[chr(i) for i in range(ord('a'), ord('z')+1)],
+    *[str(i) for i in range(10)],
+    'space', 'enter', 'tab', 'esc', 'backspace',
+    'ctrl', 'shift', 'alt', 'cmd',
+    'up', 'down', 'left', 'right',
+    *[f'f{i}' for i in range(1, 13)],
+    *[f'num_{i}' for i in range(10)],
+    'num_add', 'num_subtract', 'num_multiply', 'num_divide',
+    'mouse_left', 'mouse_right', 'mouse_middle',
+    'scroll_up', 'scroll_down'
+]
+
+# Every key in VALID_KEYS owns a fixed bit. Keys that can be pressed but not
+# bound (page_up, '?', ...) get the next free bit the first time they are seen.
+_key_bits = {key: 1 << idx for idx, key in enumerate(VALID_KEYS)}
+_key_names = {bit: key for key, bit in _key_bits.items()}
+_lock = threading.Lock()
+
+
+def key_bit(key_name):
+    bit = _key_bits.get(key_name)
+    if bit is None:
+        with _lock:
+            bit = _key_bits.get(key_name)
+            if bit is None:
+                bit = 1 << len(_key_bits)
+                _key_bits[key_name] = bit
+                _key_names[bit] = key_name
+    return bit
+
+
+def keys_mask(keys):
+    mask = 0
+    for key in keys:
+        mask |= key_bit(key.lower())
+    return mask
+
+
+def mask_keys(mask):
+    """Returns the key names set in mask, lowest bit first"""
+    keys = []
+    while mask:
+        bit = mask & -mask
+        keys.append(_key_names[bit])
+        mask ^= bit
+    return keys
@@ -0,0 +1,79 @@
+import os
+import sqlite3
+import importlib.util
+from keybrame.utils import paths
+
+# Server runtime, chosen with the 'server_mode' setting:
+#   threading  Werkzeug with a thread per connection (default, no extra deps)
+#   gevent     gevent's WSGI server, all connections on one event loop
+#
+# This module is imported by server.py before anything else, because gevent
+# has to patch the standard library before sockets are created. Threads are
+# not patched: the keyboard/mouse hooks and the tray icon block in native
+# message loops and need real OS threads. Emits from those threads are handed
+# to the event loop by bridge_emits(). subprocess is left alone too: gevent's
+# Popen only works on the main thread's loop, and ctypes.util.find_library()
+# runs one from the folder watcher's thread.
+
+SERVER_MODES = ('threading', 'gevent')
+DEFAULT_SERVER_MODE = 'threading'
+
+
+def read_server_mode(db_path=None):
+    """Reads server_mode straight from the database, before the app is imported"""
+    db_path = db_path or paths.get_database_path()
+    if not os.path.exists(db_path):
+        return DEFAULT_SERVER_MODE
+    try:
+        conn = sqlite3.connect(db_path)
+        try:
+            row = conn.execute("SELECT value FROM settings WHERE key = 'server_mode'").fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return DEFAULT_SERVER_MODE
+    return row[0] if row and row[0] in SERVER_MODES else DEFAULT_SERVER_MODE
+
+
+def is_available(mode):
+    if mode == 'threading':
+        return True
+    return importlib.util.find_spec(mode) is not None
+
+
+def prepare(mode=None):
+    """Sets up the requested runtime and returns the mode actually in use"""
+    mode = mode or read_server_mode()
+    if not is_available(mode):
+        print(f"[WARNING] Modo de servidor '{mode}' no disponible (falta el paquete), usando threading")
+        return DEFAULT_SERVER_MODE
+
+    if mode == 'gevent':
+        from gevent import monkey
+        monkey.patch_all(thread=False, queue=False, subprocess=False)
+    return mode
+
+
+def bridge_emits(socketio):
+    """Makes socketio.emit callable from any OS thread.
+
+    Calls from the event loop thread go straight through; calls from other
+    threads are queued on the loop with a thread-safe wakeup, so they are
+    sent in order and without waiting for the next poll.
+    """
+    if socketio.async_mode != 'gevent':
+        return
+
+    import gevent
+    import threading
+    from functools import partial
+
+    hub = gevent.get_hub()
+    emit = socketio.emit
+
+    def threadsafe_emit(*args, **kwargs):
+        if threading.get_ident() == hub.thread_ident:
+            return emit(*args, **kwargs)
+        hub.loop.run_callback_threadsafe(partial(gevent.spawn, emit, *args, **kwargs))
+
+    socketio.emit = threadsafe_emit
@@ -0,0 +1,68 @@
+import heapq
+import itertools
+import threading
+import time
+
+
+class TimerScheduler:
+    """Runs callbacks at a given time, all from one thread.
+
+    Pending timers live in a heap ordered by due time; the thread sleeps
+    until the earliest one or until a sooner timer is added. cancel() only
+    forgets the handle, the heap entry is skipped when it comes up.
+    Callbacks must be quick: anything slow delays every timer behind it.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._callbacks = {}
+        self._handles = itertools.count(1)
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def call_later(self, delay, callback, *args):
+        """Calls callback(*args) after delay seconds; returns a handle for cancel()"""
+        with self._condition:
+            handle = next(self._handles)
+            due = time.monotonic() + max(0, delay)
+            self._callbacks[handle] = (callback, args)
+            heapq.heappush(self._heap, (due, handle))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            elif self._heap[0][1] == handle:
+                self._condition.notify()
+            return handle
+
+    def cancel(self, handle):
+        """Returns False if the timer already ran (or was cancelled)"""
+        with self._condition:
+            return self._callbacks.pop(handle, None) is not None
+
+    def pending(self):
+        return len(self._callbacks)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while True:
+                    while self._heap and self._heap[0][1] not in self._callbacks:
+                        heapq.heappop(self._heap)
+                    if not self._heap:
+                        self._condition.wait()
+                        continue
+                    due, handle = self._heap[0]
+                    remaining = due - time.monotonic()
+                    if remaining <= 0:
+                        heapq.heappop(self._heap)
+                        callback, args = self._callbacks.pop(handle)
+                        break
+                    self._condition.wait(remaining)
+
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"[WARNING] Error en temporizador: {e}")
+
+
+scheduler = TimerScheduler()
@@ -0,0 +1,114 @@
+import time
+from keybrame.core.events import OVERLAY_ROOM
+
+# Compact overlay protocol over Server-Sent Events (GET /events), for browser
+# sources that do not need the Socket.IO client. It mirrors the image events
+# sent to the overlay room, one short frame each, with the display state
+# sequence number as the event id:
+#
+#   id: <seq>                     id: <seq>                   id: <seq>
+#   event: i                      event: t                    event: e
+#   data: <image url>             data: <transition url>      data: <final image url>
+#                                 data: <duration ms, 0 if unknown>
+#                                 data: <final image url>
+#
+# 'e' is the end of a transition, timed by the server.
+#
+# A stream starts with the current state as one of these frames (a
+# transition in progress is sent with its remaining time as duration).
+
+KEEPALIVE_INTERVAL = 15
+
+
+def _frame_id(seq):
+    return f"id: {seq}\n" if seq is not None else ""
+
+
+def image_frame(url, seq=None):
+    return f"{_frame_id(seq)}event: i\ndata: {url}\n\n"
+
+
+def transition_frame(transition_url, duration, final_url, seq=None):
+    return f"{_frame_id(seq)}event: t\ndata: {transition_url}\ndata: {duration or 0}\ndata: {final_url}\n\n"
+
+
+def transition_end_frame(url, seq=None):
+    return f"{_frame_id(seq)}event: e\ndata: {url}\n\n"
+
+
+def state_frame(state):
+    """The frame that brings a new client to state (see DisplayState.snapshot)"""
+    transition = state.get('transition')
+    if transition:
+        return transition_frame(transition['transition_image'], transition['remaining'],
+                                transition['final_image'], state['seq'])
+    return image_frame(state['image'], state['seq'])
+
+
+class OverlayStream:
+    """Fans out overlay frames to the connected SSE clients.
+
+    Frames are taken from socketio.emit (see tap()), so whatever reaches the
+    overlay room reaches the stream in the same order. Subscriber queues come
+    from the server's async mode, so waiting on them is fine in both threading
+    and gevent.
+    """
+
+    def __init__(self, socketio):
+        self.socketio = socketio
+        self._subscribers = set()
+
+    def tap(self):
+        """Wraps socketio.emit to copy overlay image events to the stream"""
+        emit = self.socketio.emit
+
+        def emit_and_stream(event, *args, **kwargs):
+            if self._subscribers and args and kwargs.get('to', kwargs.get('room')) in (None, OVERLAY_ROOM):
+                frame = self._frame(event, args[0])
+                if frame:
+                    self.publish(frame)
+            return emit(event, *args, **kwargs)
+
+        self.socketio.emit = emit_and_stream
+
+    def _frame(self, event, data):
+        if event == 'image_change':
+            return image_frame(data['image'], data.get('seq'))
+        if event == 'transition':
+            return transition_frame(data['transition_image'], data.get('duration'), data['final_image'], data.get('seq'))
+        if event == 'transition_end':
+            return transition_end_frame(data['image'], data.get('seq'))
+        return None
+
+    @property
+    def client_count(self):
+        return len(self._subscribers)
+
+    def publish(self, frame):
+        for subscriber in list(self._subscribers):
+            subscriber.put(frame)
+
+    def stream(self, initial_frame=None):
+        """Generator for one SSE response; the client retries on its own after a drop.
+
+        initial_frame() is called once subscribed, so no update can fall
+        between the first frame and the live ones.
+        """
+        eio = self.socketio.server.eio
+        subscriber = eio.create_queue()
+        queue_empty = eio.get_queue_empty_exception()
+        self._subscribers.add(subscriber)
+        try:
+            yield "retry: 1000\n\n"
+            if initial_frame:
+                yield initial_frame()
+
+            keepalive_at = time.monotonic() + KEEPALIVE_INTERVAL
+            while True:
+                try:
+                    yield subscriber.get(timeout=max(0, keepalive_at - time.monotonic()))
+                except queue_empty:
+                    yield ": \n\n"
+                    keepalive_at = time.monotonic() + KEEPALIVE_INTERVAL
+        finally:
+            self._subscribers.discard(subscriber)
@@ -2,8 +2,6 @@ import os
 import sys
 import threading
 import webbrowser
-import pystray
-from PIL import Image, ImageDraw
 from keybrame.utils import paths
 
 
@@ -12,6 +10,8 @@ _config_manager = None
 
 
 def create_icon_image():
+    from PIL import Image, ImageDraw
+
     width = 64
     height = 64
 
@@ -67,6 +67,8 @@ def quit_server(icon, item):
 
 def setup_tray_icon():
     global _tray_icon
+    # Imported on the tray thread, off the startup path
+    import pystray
 
     menu = pystray.Menu(
         pystray.MenuItem('Keybrame - OBS Image Switcher', None, enabled=False),
@@ -4,9 +4,6 @@ import subprocess
 import tempfile
 import threading
 
-import requests
-from packaging import version as version_parser
-
 from keybrame.utils.version import __version__
 
 GITHUB_REPO = "TpmyCT/keybrame"
@@ -21,6 +18,10 @@ def get_update_info():
 
 
 def check_for_updates():
+    # requests and packaging are only needed once the check runs, in its thread
+    import requests
+    from packaging import version as version_parser
+
     try:
         response = requests.get(UPDATE_CHECK_URL, timeout=5)
         if response.status_code != 200:
@@ -53,6 +54,8 @@ def check_for_updates():
 
 
 def download_and_install(update_info):
+    import requests
+
     try:
         download_url = update_info.get('download_url')
         if not download_url:
@@ -0,0 +1,218 @@
+import os
+import math
+import queue
+import threading
+from keybrame.core.assets import get_content_hash
+from keybrame.core.gallery import IMAGE_EXTENSIONS
+from keybrame.core.image import get_image_metadata
+from keybrame.utils import paths
+
+# Static images are re-encoded as WebP: lossless for formats that are already
+# lossless (so nothing is lost, just bytes), high quality for the rest.
+_LOSSLESS_FORMATS = {'PNG', 'BMP', 'TIFF'}
+_WEBP_QUALITY = 90
+
+_widths = ()
+_queue = queue.Queue()
+_pending = set()
+_lock = threading.Lock()
+_worker = None
+
+
+def configure(widths):
+    """Sets the target widths (config 'variant_widths'); an empty list disables variants"""
+    global _widths
+    new_widths = tuple(sorted(set(int(w) for w in widths or [] if int(w) > 0)))
+    changed = new_widths != _widths
+    _widths = new_widths
+
+    if _widths and changed:
+        _start_worker()
+        threading.Thread(target=backfill, daemon=True).start()
+
+
+def _start_worker():
+    global _worker
+    with _lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_run_worker, daemon=True)
+            _worker.start()
+
+
+def _run_worker():
+    while True:
+        full_path = _queue.get()
+        try:
+            generate_variants(full_path)
+        except Exception as e:
+            print(f"[WARNING] No se pudieron generar variantes de {full_path}: {e}")
+        finally:
+            with _lock:
+                _pending.discard(full_path)
+
+
+def schedule(full_path):
+    """Queues variant generation for an image (also after it is replaced or
+    deleted, to drop its stale variants), if variants are enabled"""
+    if not _widths:
+        return
+    _start_worker()
+    with _lock:
+        if full_path in _pending:
+            return
+        _pending.add(full_path)
+    _queue.put(full_path)
+
+
+def backfill():
+    """Queues every image already in the images folder"""
+    images_dir = paths.get_images_dir()
+    if not os.path.isdir(images_dir):
+        return
+    for filename in os.listdir(images_dir):
+        if os.path.splitext(filename)[1].lower() in IMAGE_EXTENSIONS:
+            schedule(os.path.join(images_dir, filename))
+
+
+def _variant_path(full_path, content_hash, width):
+    stem = os.path.splitext(os.path.basename(full_path))[0]
+    return os.path.join(paths.get_variants_dir(), f"{stem}.{content_hash}.w{width}.webp")
+
+
+def prune(stems=None):
+    """Deletes variants whose hash no longer matches an image in the images folder.
+
+    Variants are named after the source stem and content hash, so replacing
+    or deleting an image leaves its old ones behind. Only the given stems are
+    checked, or every variant on disk if stems is None.
+    """
+    variants_dir = paths.get_variants_dir()
+    try:
+        names = os.listdir(variants_dir)
+    except OSError:
+        return
+
+    # stem -> {hash: [variant file names]}
+    found = {}
+    for name in names:
+        parts = name.rsplit('.', 3)
+        if len(parts) == 4 and parts[3] == 'webp' and (stems is None or parts[0] in stems):
+            found.setdefault(parts[0], {}).setdefault(parts[1], []).append(name)
+    if not found:
+        return
+
+    images_dir = paths.get_images_dir()
+    current = {}
+    try:
+        for filename in os.listdir(images_dir):
+            stem, ext = os.path.splitext(filename)
+            if stem in found and ext.lower() in IMAGE_EXTENSIONS:
+                current.setdefault(stem, set()).add(get_content_hash(os.path.join(images_dir, filename)))
+    except OSError:
+        return
+
+    removed = 0
+    for stem, by_hash in found.items():
+        for content_hash, variant_names in by_hash.items():
+            if content_hash in current.get(stem, ()):
+                continue
+            for name in variant_names:
+                try:
+                    os.remove(os.path.join(variants_dir, name))
+                    removed += 1
+                except OSError:
+                    pass
+    if removed:
+        print(f"[INFO] Variantes obsoletas eliminadas: {removed}")
+
+
+def _target_widths(metadata):
+    source_width = metadata['width']
+    widths = [w for w in _widths if w < source_width]
+    if metadata['format'] == 'BMP':
+        # Uncompressed: worth transcoding even at full size
+        widths.append(source_width)
+    return widths
+
+
+def _is_static(metadata):
+    return metadata['frames'] == 1 and bool(metadata['width']) and bool(metadata['height'])
+
+
+def generate_variants(full_path):
+    # Variants of the file's previous contents (or of a deleted file)
+    prune({os.path.splitext(os.path.basename(full_path))[0]})
+
+    metadata = get_image_metadata(full_path)
+    if not _is_static(metadata):
+        return
+
+    content_hash = get_content_hash(full_path)
+    if content_hash is None:
+        return
+
+    missing = [w for w in _target_widths(metadata)
+               if not os.path.exists(_variant_path(full_path, content_hash, w))]
+    if not missing:
+        return
+
+    os.makedirs(paths.get_variants_dir(), exist_ok=True)
+    lossless = metadata['format'] in _LOSSLESS_FORMATS
+
+    from PIL import Image
+    with Image.open(full_path) as img:
+        img.load()
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGBA' if 'transparency' in img.info or img.mode in ('LA', 'PA') else 'RGB')
+
+        for width in missing:
+            height = max(1, round(metadata['height'] * width / metadata['width']))
+            resized = img if width == metadata['width'] else img.resize((width, height), Image.LANCZOS)
+
+            target = _variant_path(full_path, content_hash, width)
+            tmp_path = target + '.tmp'
+            if lossless:
+                resized.save(tmp_path, 'WEBP', lossless=True, method=4)
+            else:
+                resized.save(tmp_path, 'WEBP', quality=_WEBP_QUALITY, method=4)
+            os.replace(tmp_path, target)
+
+    print(f"[INFO] Variantes generadas para {os.path.basename(full_path)}: {missing}")
+
+
+def get_variant(full_path, box_width=None, box_height=None):
+    """Returns (path, pending) for the best pre-scaled variant of full_path for a box.
+
+    A None path means the original should be served: variants are disabled,
+    the image is animated or already fits the box, or the variant is not
+    generated yet. Only in that last case pending is True (and the image gets
+    queued), so the original is a stand-in and not the answer for that box.
+    """
+    if not _widths or not (box_width or box_height):
+        return None, False
+
+    metadata = get_image_metadata(full_path)
+    if not _is_static(metadata):
+        return None, False
+
+    # Width the image is displayed at when fit (object-fit: contain) into the box
+    needed = math.inf
+    if box_width:
+        needed = box_width
+    if box_height:
+        needed = min(needed, math.ceil(box_height * metadata['width'] / metadata['height']))
+
+    width = next((w for w in _target_widths(metadata) if w >= needed), None)
+    if width is None:
+        return None, False
+
+    content_hash = get_content_hash(full_path)
+    if content_hash is None:
+        return None, False
+
+    variant = _variant_path(full_path, content_hash, width)
+    if os.path.exists(variant):
+        return variant, False
+
+    schedule(full_path)
+    return None, True
@@ -0,0 +1,214 @@
+import os
+import sys
+import time
+import select
+import struct
+import ctypes
+import ctypes.util
+import threading
+from stat import S_ISREG
+from keybrame.utils import paths
+
+# Folder watching for the images directory. On Linux the kernel reports
+# changes through inotify (called via ctypes, no extra dependency); anywhere
+# else, or if inotify cannot be set up, the folder is rescanned periodically.
+
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_IGNORED = 0x00008000
+_IN_CLOEXEC = 0o2000000
+_IN_NONBLOCK = 0o4000
+
+_WATCH_MASK = (_IN_CLOSE_WRITE | _IN_ATTRIB | _IN_MOVED_FROM | _IN_MOVED_TO |
+               _IN_CREATE | _IN_DELETE | _IN_DELETE_SELF | _IN_MOVE_SELF)
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+def _load_inotify():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class AssetWatcher:
+    """Keeps the set of files in the images folder up to date in memory.
+
+    Listeners are called as callback(changed, removed) with sets of file
+    names, from the watcher thread, after a short debounce so a burst of
+    writes to the same file is reported once (or from the caller of
+    refresh()). exists() checks the filesystem for names not in the set,
+    and for everything until start() is called.
+    """
+
+    def __init__(self, poll_interval=2.0, debounce=0.2):
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.backend = None
+        self._files = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self._running = False
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def exists(self, filename):
+        # Misses (other case on Windows, subfolders, not started yet) are
+        # left to the filesystem
+        if self._running and filename in self._files:
+            return True
+        return os.path.isfile(os.path.join(paths.get_images_dir(), filename))
+
+    def refresh(self, *filenames):
+        """Re-stats files changed by the app itself, so they are known before the OS event arrives"""
+        if self._running:
+            self._apply(set(filenames))
+
+    def files(self):
+        with self._lock:
+            return dict(self._files)
+
+    def start(self):
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+        self._files = self._scan()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+
+    def _stat(self, filename):
+        try:
+            stat = os.stat(os.path.join(paths.get_images_dir(), filename))
+        except OSError:
+            return None
+        if not S_ISREG(stat.st_mode):
+            return None
+        return (stat.st_size, stat.st_mtime_ns)
+
+    def _scan(self):
+        files = {}
+        try:
+            with os.scandir(paths.get_images_dir()) as it:
+                for entry in it:
+                    try:
+                        if entry.is_file():
+                            stat = entry.stat()
+                            files[entry.name] = (stat.st_size, stat.st_mtime_ns)
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return files
+
+    def _apply(self, names=None):
+        """Re-stats names (or rescans everything) and notifies what changed"""
+        if names is None:
+            current = self._scan()
+            names = set(current) | set(self._files)
+        else:
+            current = {name: self._stat(name) for name in names}
+
+        changed = set()
+        removed = set()
+        with self._lock:
+            for name in names:
+                fingerprint = current.get(name)
+                if fingerprint is None:
+                    if self._files.pop(name, None) is not None:
+                        removed.add(name)
+                elif self._files.get(name) != fingerprint:
+                    self._files[name] = fingerprint
+                    changed.add(name)
+
+        if changed or removed:
+            for callback in list(self._listeners):
+                try:
+                    callback(changed, removed)
+                except Exception as e:
+                    print(f"[WARNING] Error notificando cambios de assets: {e}")
+
+    def _run(self):
+        libc = _load_inotify()
+        if libc is not None:
+            try:
+                self._run_inotify(libc)
+            except OSError as e:
+                print(f"[WARNING] inotify no disponible ({e}), usando sondeo")
+        if self._running:
+            self._run_polling()
+
+    def _run_polling(self):
+        self.backend = 'polling'
+        while self._running:
+            time.sleep(self.poll_interval)
+            self._apply()
+
+    def _run_inotify(self, libc):
+        images_dir = paths.get_images_dir()
+        fd = libc.inotify_init1(_IN_CLOEXEC | _IN_NONBLOCK)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1')
+        try:
+            if libc.inotify_add_watch(fd, os.fsencode(images_dir), _WATCH_MASK) < 0:
+                raise OSError(ctypes.get_errno(), 'inotify_add_watch')
+
+            self.backend = 'inotify'
+            # Catch anything that changed between the initial scan and the watch
+            self._apply()
+
+            while self._running:
+                ready, _, _ = select.select([fd], [], [], 1.0)
+                if not ready:
+                    continue
+
+                names = set()
+                lost = False
+                deadline = time.monotonic() + self.debounce
+                while True:
+                    try:
+                        data = os.read(fd, 64 * 1024)
+                    except BlockingIOError:
+                        data = b''
+
+                    pos = 0
+                    while pos + _EVENT_HEADER.size <= len(data):
+                        _, mask, _, length = _EVENT_HEADER.unpack_from(data, pos)
+                        name = data[pos + _EVENT_HEADER.size:pos + _EVENT_HEADER.size + length]
+                        pos += _EVENT_HEADER.size + length
+                        if mask & (_IN_DELETE_SELF | _IN_MOVE_SELF | _IN_IGNORED):
+                            lost = True
+                        elif name:
+                            names.add(os.fsdecode(name.rstrip(b'\0')))
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                        break
+
+                if lost:
+                    # The folder itself went away, rescan and fall back to polling
+                    self._apply()
+                    return
+                if names:
+                    self._apply(names)
+        finally:
+            os.close(fd)
+
+
+asset_watcher = AssetWatcher()
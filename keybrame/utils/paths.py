@@ -35,6 +35,15 @@ def get_logs_dir():
         return os.path.join(project_root, 'logs')
     return os.path.join(get_app_data_dir(), 'logs')
 
+def get_cache_dir():
+    if not getattr(sys, 'frozen', False):
+        project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        return os.path.join(project_root, 'cache')
+    return os.path.join(get_app_data_dir(), 'cache')
+
+def get_variants_dir():
+    return os.path.join(get_cache_dir(), 'variants')
+
 def get_log_file():
     return os.path.join(get_logs_dir(), 'server.log')
 
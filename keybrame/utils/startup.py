@@ -0,0 +1,50 @@
+import time
+import socket
+from contextlib import contextmanager
+
+
+class StartupProfile:
+    """Startup timings per phase, printed when running with --profile-startup.
+
+    Times are measured from the creation of the profile, which server.py does
+    before importing anything heavy.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.started = time.perf_counter()
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, start - self.started, time.perf_counter() - start))
+
+    def mark(self, name):
+        """Records a point in time, e.g. the moment the port accepts connections"""
+        self.phases.append((name, time.perf_counter() - self.started, None))
+
+    def report(self, width=60):
+        if not self.enabled:
+            return
+        print("=" * width)
+        print(f"  {'Fase':<24}{'Inicio (ms)':>14}{'Duración (ms)':>16}")
+        for name, start, duration in self.phases:
+            duration = '' if duration is None else f"{duration * 1000:.1f}"
+            print(f"  {name:<24}{start * 1000:>14.1f}{duration:>16}")
+        print("=" * width)
+
+
+def wait_until_listening(port, timeout=10.0):
+    """Waits until something accepts connections on localhost:port"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.01)
+    return False
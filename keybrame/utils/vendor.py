@@ -0,0 +1,33 @@
+import os
+
+# Third-party browser scripts served from /vendor/ instead of a CDN, so
+# overlays start without any external fetch. The files are downloaded by
+# scripts/build.py; when one is missing the server redirects to the CDN.
+
+SOCKETIO_CLIENT_VERSION = '4.5.4'
+SOCKETIO_CLIENT = f'socket.io-{SOCKETIO_CLIENT_VERSION}.min.js'
+
+VENDOR_FILES = {
+    SOCKETIO_CLIENT: f'https://cdn.socket.io/{SOCKETIO_CLIENT_VERSION}/socket.io.min.js',
+}
+
+
+def get_vendor_dir(static_dir):
+    return os.path.join(static_dir, 'vendor')
+
+
+def fetch_vendor_files(static_dir):
+    """Downloads the vendor files that are not present yet"""
+    import requests
+
+    vendor_dir = get_vendor_dir(static_dir)
+    os.makedirs(vendor_dir, exist_ok=True)
+    for filename, url in VENDOR_FILES.items():
+        target = os.path.join(vendor_dir, filename)
+        if os.path.exists(target):
+            continue
+        response = requests.get(url, timeout=30)
+        response.raise_for_status()
+        with open(target, 'wb') as f:
+            f.write(response.content)
+        print(f"[OK] Descargado {filename}")
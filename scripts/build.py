@@ -6,6 +6,7 @@ import shutil
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from keybrame.utils.version import __version__
+from keybrame.utils.vendor import fetch_vendor_files
 
 VERSION = __version__
 
@@ -22,6 +23,9 @@ except PermissionError:
     print("(Right-click the tray icon -> Stop server)\n")
     sys.exit(1)
 
+# Bundled so overlays never load scripts from a CDN
+fetch_vendor_files('static')
+
 args = [
     'server.py',
     '--name=Keybrame',
@@ -36,15 +40,34 @@ args = [
     '--hidden-import=pystray',
     '--hidden-import=PIL',
     '--hidden-import=engineio.async_drivers.threading',
+    '--hidden-import=engineio.async_drivers.gevent',
     '--hidden-import=keybrame.api.settings',
     '--hidden-import=keybrame.api.keybindings',
     '--hidden-import=keybrame.api.images',
     '--hidden-import=keybrame.api.server_control',
     '--hidden-import=keybrame.api.validation',
     '--hidden-import=keybrame.config.manager',
+    '--hidden-import=keybrame.config.pool',
+    '--hidden-import=keybrame.config.snapshot',
     '--hidden-import=keybrame.core.image',
+    '--hidden-import=keybrame.core.animation',
+    '--hidden-import=keybrame.core.assets',
+    '--hidden-import=keybrame.core.variants',
+    '--hidden-import=keybrame.core.atlas',
+    '--hidden-import=keybrame.core.analysis',
+    '--hidden-import=keybrame.core.gallery',
+    '--hidden-import=keybrame.core.watcher',
+    '--hidden-import=keybrame.core.bindings',
+    '--hidden-import=keybrame.core.keymask',
+    '--hidden-import=keybrame.core.events',
+    '--hidden-import=keybrame.core.runtime',
+    '--hidden-import=keybrame.core.stream',
+    '--hidden-import=keybrame.core.display',
+    '--hidden-import=keybrame.core.scheduler',
+    '--hidden-import=keybrame.utils.vendor',
     '--hidden-import=keybrame.utils.version',
     '--hidden-import=keybrame.utils.paths',
+    '--hidden-import=keybrame.utils.startup',
 ]
 
 if os.path.exists('scripts/app.ico'):
@@ -1,39 +1,77 @@
 import sys
+from keybrame.utils.startup import StartupProfile, wait_until_listening
+
+profile = StartupProfile('--profile-startup' in sys.argv)
+
+# The server runtime has to be set up before the web stack is imported
+with profile.phase('runtime'):
+    from keybrame.core import runtime
+    SERVER_MODE = runtime.prepare()
+
 import webbrowser
 import threading
 import time
-from keybrame.app import create_app
-from keybrame.core.keyboard import KeyboardMouseHandler
-from keybrame.core.tray import start_tray_icon
-from keybrame.config.manager import ConfigManager
 from keybrame.utils import version, paths
 from keybrame.utils.console import print_banner, print_info, print_startup_message
 
 
+def start_background_services(app, socketio, config_manager, port):
+    """Input hooks, tray icon and update check, started once the port is open.
+
+    None of them is needed to serve the overlay, so they load (pynput,
+    pystray, Pillow, the updater) while browser sources are already connecting.
+    """
+    if wait_until_listening(port):
+        profile.mark('escuchando')
+    else:
+        print(f"[WARNING] El servidor no responde en el puerto {port}, iniciando servicios igualmente")
+
+    with profile.phase('teclado y mouse'):
+        from keybrame.core.keyboard import KeyboardMouseHandler
+        keyboard_handler = KeyboardMouseHandler(config_manager, socketio)
+        keyboard_handler.start()
+        app.set_keyboard_handler(keyboard_handler)
+
+    with profile.phase('system tray'):
+        from keybrame.core.tray import start_tray_icon
+        start_tray_icon(config_manager, socketio)
+
+    if version.AUTO_UPDATE_CHECK:
+        with profile.phase('actualizaciones'):
+            from keybrame.core.updater import check_updates_async
+            check_updates_async(socketio)
+
+    profile.report()
+
+
 def main():
     print_banner(version.get_version_string())
 
-    config_manager = ConfigManager(paths.get_database_path())
-    app, socketio = create_app(config_manager)
+    with profile.phase('imports'):
+        from keybrame.app import create_app
+        from keybrame.config.manager import ConfigManager
+
+    with profile.phase('configuración'):
+        config_manager = ConfigManager(paths.get_database_path())
+        config = config_manager.get_config()
+
+    with profile.phase('aplicación'):
+        app, socketio = create_app(config_manager, async_mode=SERVER_MODE)
 
-    config = config_manager.get_config()
     print_info({
         'Puerto': config['port'],
         'URL para OBS': f"http://localhost:{config['port']}",
         'Panel de administración': f"http://localhost:{config['port']}/admin",
         'Carpeta de datos': paths.get_app_data_dir(),
-        'Carpeta de imágenes': paths.get_images_dir()
+        'Carpeta de imágenes': paths.get_images_dir(),
+        'Servidor': SERVER_MODE
     })
 
-    if version.AUTO_UPDATE_CHECK:
-        from keybrame.core.updater import check_updates_async
-        check_updates_async(socketio)
-
-    keyboard_handler = KeyboardMouseHandler(config_manager, socketio)
-    keyboard_handler.start()
-    app.set_keyboard_handler(keyboard_handler)
-
-    start_tray_icon(config_manager, socketio)
+    threading.Thread(
+        target=start_background_services,
+        args=(app, socketio, config_manager, config['port']),
+        daemon=True
+    ).start()
 
     def open_browser():
         time.sleep(2)
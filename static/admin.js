@@ -10,6 +10,7 @@ class KeybrameAdmin {
         this.isRecording = false;
         this.recordingKeys = new Set();
         this.recordKeyHandler = null;
+        this.keysSubscribed = false;
         this.serverStopping = false;
         this.serverUpdating = false;
 
@@ -49,14 +50,22 @@ class KeybrameAdmin {
     }
 
     setupSocketIO() {
-        this.socket = io();
+        this.socket = io(window.SOCKET_OPTIONS || {});
 
         this.socket.on('connect', () => {
             if (this.serverUpdating) {
                 window.location.reload();
             }
+
+            // The admin socket never shows images (the preview iframe has its own)
+            this.socket.emit('unsubscribe', { channel: 'overlay' });
+            this.keysSubscribed = false;
+            this.updateKeySubscription();
         });
 
+        // Only visible tabs receive the raw key stream
+        document.addEventListener('visibilitychange', () => this.updateKeySubscription());
+
         this.socket.on('disconnect', () => {
             if (this.serverUpdating) {
                 document.getElementById('server-updating-overlay').style.display = 'flex';
@@ -75,6 +84,29 @@ class KeybrameAdmin {
             this.updatePressedKeysDisplay();
         });
 
+        // Coalesced key events (key_event_window_ms > 0): replay to the regular handlers
+        this.socket.on('key_events', (data) => {
+            data.events.forEach(([event, key]) => {
+                this.socket.listeners(event).forEach(handler => handler({ key }));
+            });
+        });
+
+        // Background analysis of uploaded images (GIF durations)
+        this.socket.on('image_analyzed', (data) => {
+            const index = this.images.findIndex(img => img.filename === data.filename);
+            if (index === -1) return;
+
+            this.images[index] = { ...this.images[index], ...data };
+            clearTimeout(this.imageRenderTimeout);
+            this.imageRenderTimeout = setTimeout(() => this.renderImageGallery(), 200);
+        });
+
+        // Images added, replaced or removed on disk (also outside the admin panel)
+        this.socket.on('assets_changed', () => {
+            clearTimeout(this.imageReloadTimeout);
+            this.imageReloadTimeout = setTimeout(() => this.loadImages(), 300);
+        });
+
         this.socket.on('update_available', (data) => this.showUpdateBanner(data));
         this.socket.on('update_progress', (data) => this.onUpdateProgress(data.progress));
         this.socket.on('update_installing', () => {
@@ -86,6 +118,20 @@ class KeybrameAdmin {
         });
     }
 
+    updateKeySubscription() {
+        if (!this.socket || !this.socket.connected) return;
+
+        const wanted = this.isRecording || document.visibilityState === 'visible';
+        if (wanted === this.keysSubscribed) return;
+
+        this.keysSubscribed = wanted;
+        this.socket.emit(wanted ? 'subscribe' : 'unsubscribe', { channel: 'keys' });
+        if (!wanted) {
+            this.pressedKeys.clear();
+            this.updatePressedKeysDisplay();
+        }
+    }
+
     showUpdateBanner(data) {
         if (document.getElementById('update-banner')) return;
 
@@ -162,6 +208,13 @@ class KeybrameAdmin {
             document.getElementById('input-default-image').value = this.removeImagesPrefix(this.settings.default_image) || '';
             this.updateDefaultImagePreview();
 
+            document.getElementById('input-transition-retrigger').value = this.settings.transition_retrigger || 'cancel';
+            document.getElementById('input-key-event-window').value = this.settings.key_event_window_ms || 0;
+            document.getElementById('input-variant-widths').value = (this.settings.variant_widths || []).join(', ');
+            document.getElementById('input-atlas-mode').checked = !!this.settings.atlas_mode;
+            document.getElementById('input-server-mode').value = this.settings.server_mode || 'threading';
+            document.getElementById('input-websocket-only').checked = !!this.settings.websocket_only;
+
             const port = this.settings.port || 5000;
             document.getElementById('obs-url-display').value = `http://localhost:${port}/`;
 
@@ -375,27 +428,37 @@ class KeybrameAdmin {
     }
 
     async uploadImages(files) {
-        for (const file of files) {
-            const formData = new FormData();
-            formData.append('file', file);
-
-            try {
-                const response = await fetch('/api/images/upload', {
-                    method: 'POST',
-                    body: formData
-                });
+        // One request for the whole batch; durations arrive later via 'image_analyzed'
+        const formData = new FormData();
+        files.forEach(file => formData.append('file', file));
 
-                const result = await response.json();
+        try {
+            const response = await fetch('/api/images/upload', {
+                method: 'POST',
+                body: formData
+            });
 
+            const result = await response.json();
+
+            if (files.length === 1) {
                 if (!response.ok) {
                     throw new Error(result.error || 'Upload failed');
                 }
-
                 this.showNotification(`Subido: ${this.removeImagesPrefix(result.filename)}`, 'success');
-
-            } catch (error) {
-                this.showNotification(`Error al subir ${file.name}: ${error.message}`, 'error');
+            } else {
+                if (!result.uploaded) {
+                    throw new Error(result.error || 'Upload failed');
+                }
+                if (result.uploaded.length) {
+                    this.showNotification(`Subidas ${result.uploaded.length} imágenes`, 'success');
+                }
+                result.errors.forEach(err => {
+                    this.showNotification(`Error al subir ${err.filename}: ${err.error}`, 'error');
+                });
             }
+
+        } catch (error) {
+            this.showNotification(`Error al subir imágenes: ${error.message}`, 'error');
         }
 
         await this.loadImages();
@@ -709,9 +772,28 @@ class KeybrameAdmin {
                 return;
             }
 
+            const keyEventWindow = parseInt(document.getElementById('input-key-event-window').value || '0');
+            if (isNaN(keyEventWindow) || keyEventWindow < 0 || keyEventWindow > 1000) {
+                this.showNotification('La agrupación de eventos debe estar entre 0 y 1000 ms.', 'error');
+                return;
+            }
+
+            const widthsText = document.getElementById('input-variant-widths').value.trim();
+            const variantWidths = widthsText ? widthsText.split(',').map(w => Number(w.trim())) : [];
+            if (variantWidths.some(w => !Number.isInteger(w) || w < 16 || w > 8192)) {
+                this.showNotification('Los anchos deben ser números entre 16 y 8192, separados por comas.', 'error');
+                return;
+            }
+
             const data = {
                 port: portValue,
-                default_image: this.addImagesPrefix(document.getElementById('input-default-image').value)
+                default_image: this.addImagesPrefix(document.getElementById('input-default-image').value),
+                transition_retrigger: document.getElementById('input-transition-retrigger').value,
+                key_event_window_ms: keyEventWindow,
+                variant_widths: variantWidths,
+                atlas_mode: document.getElementById('input-atlas-mode').checked ? 1 : 0,
+                server_mode: document.getElementById('input-server-mode').value,
+                websocket_only: document.getElementById('input-websocket-only').checked ? 1 : 0
             };
 
             const response = await fetch('/api/settings', {
@@ -731,7 +813,6 @@ class KeybrameAdmin {
                 this.showNotification('Configuración guardada exitosamente', 'success');
             }
 
-            await this.reloadConfig();
             this.updateDefaultImagePreview();
 
             const previewIframe = document.getElementById('preview-iframe');
@@ -749,7 +830,7 @@ class KeybrameAdmin {
     }
 
     async restartAndRedirect(newPort) {
-        this.showNotification('Reiniciando servidor con nuevo puerto...', 'info');
+        this.showNotification('Reiniciando servidor para aplicar la configuración...', 'info');
 
         try {
             await fetch('/api/server/restart', { method: 'POST' });
@@ -884,7 +965,6 @@ class KeybrameAdmin {
 
             this.closeModal();
             await this.loadKeybindings();
-            await this.reloadConfig();
 
         } catch (error) {
             this.showNotification('Error al guardar atajo: ' + error.message, 'error');
@@ -913,7 +993,6 @@ class KeybrameAdmin {
 
             this.showNotification('Atajo eliminado exitosamente', 'success');
             await this.loadKeybindings();
-            await this.reloadConfig();
 
         } catch (error) {
             this.showNotification('Error al eliminar atajo: ' + error.message, 'error');
@@ -966,6 +1045,7 @@ class KeybrameAdmin {
 
         if (this.socket) {
             this.socket.on('key_pressed', this.recordKeyHandler);
+            this.updateKeySubscription();
         } else {
             this.showNotification('Error: Recarga la página', 'error');
         }
@@ -977,6 +1057,7 @@ class KeybrameAdmin {
         if (this.socket && this.recordKeyHandler) {
             this.socket.off('key_pressed', this.recordKeyHandler);
             this.recordKeyHandler = null;
+            this.updateKeySubscription();
         }
 
         this.recordingKeys.forEach(key => {